@@ -275,60 +275,82 @@ export default function Dashboard() {
       );
     };
 
+    // The server coalesces bursts of events into {type: "batch", events: [...]}
+    const handleEvent = (data: any) => {
+      switch (data.type) {
+        case "log":
+          setLogs((prev) => [...prev, { line: data.line ?? "", ts: data.ts ?? "" }]);
+          break;
+        case "llm_token":
+          // Streamed AI output — extend the last log line, newlines start new ones
+          setLogs((prev) => {
+            if (prev.length === 0) return prev;
+            const [head, ...rest] = String(data.delta ?? "").split("\n");
+            const last = prev[prev.length - 1];
+            return [
+              ...prev.slice(0, -1),
+              { ...last, line: last.line + head },
+              ...rest.map((line) => ({ line: `    ${line}`, ts: last.ts })),
+            ];
+          });
+          break;
+        case "step":
+          updateStep(data.step as PipelineStep, data.status as StepStatus);
+          break;
+        case "iteration":
+          setCIRuns((prev) => [
+            ...prev,
+            {
+              iteration: data.iteration,
+              status: data.status,
+              errors_count: data.errors_count,
+              timestamp: new Date().toLocaleTimeString("en-GB", { hour12: false }),
+            },
+          ]);
+          setMaxIterations(data.total || 5);
+          break;
+        case "fix":
+          setFixes((prev) => [...prev, data.fix]);
+          break;
+        case "complete":
+          setFinalResult(data.result);
+          setPhase("done");
+          // Use setTimeout to allow any in-flight `pr_created` event that
+          // arrived in the same WebSocket flush to be processed first.
+          if (data.result?.passed && data.result?.branch_name) {
+            setTimeout(() => {
+              if (prCreatedRef.current) {
+                // Backend already auto-created a PR — show the success dialog
+                setShowPrDialog(true);
+              } else {
+                // No auto PR (e.g. unauthenticated flow or it failed) —
+                // let the user create the PR manually
+                setShowCreatePRDialog(true);
+              }
+            }, 300);
+          }
+          break;
+        case "error":
+          setErrorMessage(data.message);
+          setFailedStep(data.step === "cloning" ? "cloning" : "executing");
+          setPhase("failed");
+          break;
+        case "pr_created":
+          // PR was auto-created by backend - store URL
+          setPrUrl(data.pr_url);
+          setPrRepoName(data.repo_name);
+          prCreatedRef.current = true; // Mark that PR was created
+          break;
+      }
+    };
+
     ws.onmessage = (event) => {
       try {
         const data = JSON.parse(event.data);
-        switch (data.type) {
-          case "log":
-            setLogs((prev) => [...prev, { line: data.line ?? "", ts: data.ts ?? "" }]);
-            break;
-          case "step":
-            updateStep(data.step as PipelineStep, data.status as StepStatus);
-            break;
-          case "iteration":
-            setCIRuns((prev) => [
-              ...prev,
-              {
-                iteration: data.iteration,
-                status: data.status,
-                errors_count: data.errors_count,
-                timestamp: new Date().toLocaleTimeString("en-GB", { hour12: false }),
-              },
-            ]);
-            setMaxIterations(data.total || 5);
-            break;
-          case "fix":
-            setFixes((prev) => [...prev, data.fix]);
-            break;
-          case "complete":
-            setFinalResult(data.result);
-            setPhase("done");
-            // Use setTimeout to allow any in-flight `pr_created` event that
-            // arrived in the same WebSocket flush to be processed first.
-            if (data.result?.passed && data.result?.branch_name) {
-              setTimeout(() => {
-                if (prCreatedRef.current) {
-                  // Backend already auto-created a PR — show the success dialog
-                  setShowPrDialog(true);
-                } else {
-                  // No auto PR (e.g. unauthenticated flow or it failed) —
-                  // let the user create the PR manually
-                  setShowCreatePRDialog(true);
-                }
-              }, 300);
-            }
-            break;
-          case "error":
-            setErrorMessage(data.message);
-            setFailedStep(data.step === "cloning" ? "cloning" : "executing");
-            setPhase("failed");
-            break;
-          case "pr_created":
-            // PR was auto-created by backend - store URL
-            setPrUrl(data.pr_url);
-            setPrRepoName(data.repo_name);
-            prCreatedRef.current = true; // Mark that PR was created
-            break;
+        if (data.type === "batch") {
+          for (const e of data.events ?? []) handleEvent(e);
+        } else {
+          handleEvent(data);
         }
       } catch {
         // ignore parse errors
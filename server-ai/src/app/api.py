@@ -1,19 +1,28 @@
 """Entry point — starts the uvicorn server."""
 
+import sys
+
 import uvicorn
 
-from src.app.config import api_settings
+from src.app.config import get_settings
 
 
 def main():
+    api_settings = get_settings()
     uvicorn.run(
         "src.app.app:init_app",
         factory=True,
         host=api_settings.host,
         port=api_settings.port,
+        # Each worker runs its own lifespan: the EC2 pool and its concurrency/rate
+        # caps, the result and LLM caches, and results.json writes are all
+        # per-process. Hence the single-worker default.
         workers=api_settings.uvicorn_workers,
         reload=api_settings.reload,
         log_level=api_settings.log_level,
+        # uvloop is not available on Windows (run.bat)
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
     )
 
 
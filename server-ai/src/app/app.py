@@ -1,78 +1,120 @@
 """Application factory — builds and returns the FastAPI app."""
 
+import asyncio
 import logging
 import sys
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
 
-from src.app.config import api_settings
+from src.app.config import get_settings
 from src.endpoints import health_router, agent_router, agent_ws_router, pr_router
 
+logger = logging.getLogger("rift_server")
+
 
 def _configure_logging() -> None:
     """Set up a readable log format for the RIFT server."""
     fmt = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
     date_fmt = "%H:%M:%S"
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(logging.Formatter(fmt, datefmt=date_fmt))
-
-    root = logging.getLogger()
-    root.setLevel(logging.DEBUG if api_settings.debug else logging.INFO)
-    # Remove any existing handlers (prevents duplicate output with uvicorn)
-    root.handlers.clear()
-    root.addHandler(handler)
+    # force=True replaces any existing root handlers (prevents duplicate output with uvicorn)
+    logging.basicConfig(
+        level=logging.DEBUG if get_settings().debug else logging.INFO,
+        format=fmt,
+        datefmt=date_fmt,
+        stream=sys.stdout,
+        force=True,
+    )
 
     # Keep uvicorn's own loggers at INFO so we still see request lines
     for uv_logger in ("uvicorn", "uvicorn.access", "uvicorn.error"):
         logging.getLogger(uv_logger).setLevel(logging.INFO)
 
 
+async def _check_ec2_agent(app: FastAPI) -> None:
+    """Ping the EC2 agent once (time-bounded) and cache the result on app.state."""
+    from src.services.ec2_client import EC2Client
+    client = EC2Client(app.state.http_client)
+    try:
+        await asyncio.wait_for(client.ping(), timeout=get_settings().ec2_ping_timeout)
+        app.state.ec2_reachable = True
+        logger.info("EC2 agent reachable ✓")
+    except Exception as e:
+        app.state.ec2_reachable = False
+        reason = e if str(e) else type(e).__name__
+        logger.warning("EC2 agent not reachable at %s — %s", get_settings().ec2_agent_url, reason)
+        logger.warning("The server will start, but agent runs will fail until the EC2 agent is up.")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown lifecycle."""
     # --- Startup ---
-    print(f"{api_settings.app_name} v{api_settings.version} starting...")
-    print(f"EC2 Agent URL: {api_settings.ec2_agent_url}")
-    print(f"LLM Model: {api_settings.llm_model}")
-    print(f"Max iterations: {api_settings.max_iterations}")
+    settings = get_settings()
+    logger.info("%s v%s starting...", settings.app_name, settings.version)
+    logger.info("EC2 Agent URL: %s", settings.ec2_agent_url)
+    logger.info("LLM Model: %s", settings.llm_model)
+    logger.info("Max iterations: %s", settings.max_iterations)
 
-    # Verify EC2 agent is reachable (soft check — don't crash if it's down)
-    from src.services.ec2_client import EC2Client
-    client = EC2Client()
-    try:
-        await client.ping()
-        print("EC2 agent reachable ✓")
-    except Exception as e:
-        print(f"WARNING: EC2 agent not reachable at {api_settings.ec2_agent_url} — {e}")
-        print("The server will start, but agent runs will fail until the EC2 agent is up.")
+    # Shared, pooled HTTP client for all EC2Client instances in this worker
+    from src.services.ec2_client import get_http_client, close_http_client
+    app.state.http_client = get_http_client()
+
+    # Compile the healing graph now so the first run doesn't pay for it
+    from src.graph.healing_graph import get_graph
+    get_graph()
+
+    # Verify EC2 agent is reachable (soft check — don't crash if it's down).
+    # Runs in the background so startup never waits on a slow/unreachable agent.
+    app.state.ec2_reachable = None  # unknown until the ping completes
+    ping_task = asyncio.create_task(_check_ec2_agent(app))
 
     yield  # App is running
 
     # --- Shutdown ---
-    print("Shutting down...")
+    ping_task.cancel()
+    from src.runner.agent_runner import drain_pending_writes
+    await drain_pending_writes()
+    await close_http_client()
+    logger.info("Shutting down...")
 
 
 def init_app() -> FastAPI:
     """Application factory."""
     _configure_logging()
+    settings = get_settings()
     app = FastAPI(
-        title=api_settings.app_name,
-        version=api_settings.version,
-        debug=api_settings.debug,
+        title=settings.app_name,
+        version=settings.version,
+        debug=settings.debug,
+        default_response_class=ORJSONResponse,
         lifespan=lifespan,
     )
 
     # CORS
     app.add_middleware(
         CORSMiddleware,
-        allow_origins=api_settings.cors_allow_origins,
+        allow_origins=settings.cors_allow_origins,
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
     )
 
+    # Middleware must be pure ASGI — BaseHTTPMiddleware wraps every request in
+    # extra tasks/streams and costs a large share of throughput. Write new ones as:
+    #
+    #     class MyMiddleware:
+    #         def __init__(self, app): self.app = app
+    #         async def __call__(self, scope, receive, send):
+    #             await self.app(scope, receive, send)
+    for mw in app.user_middleware:
+        # Explicit raise, not assert — the check must survive `python -O`
+        if issubclass(mw.cls, BaseHTTPMiddleware):
+            raise RuntimeError("Use pure ASGI middleware")
+
     # Routers
     api_prefix = "/api/v1"
     app.include_router(health_router, prefix=api_prefix)
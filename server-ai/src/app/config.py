@@ -1,5 +1,7 @@
 """Main Server configuration — Pydantic BaseSettings."""
 
+from functools import lru_cache
+
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings
 
@@ -15,7 +17,13 @@ class ApiSettings(BaseSettings):
     # ── Server ──
     host: str = Field(default="0.0.0.0", description="Bind host")
     port: int = Field(default=8000, description="Port to listen on")
-    uvicorn_workers: int = Field(default=1, description="Uvicorn worker processes")
+    uvicorn_workers: int = Field(
+        default=1,
+        description=(
+            "Uvicorn worker processes. Caches, EC2 limits and results.json are "
+            "per process, so the ec2_max_* caps multiply with this"
+        ),
+    )
     reload: bool = Field(default=False, description="Auto-reload on code changes")
 
     # ── Logging ──
@@ -36,6 +44,26 @@ class ApiSettings(BaseSettings):
         default="",
         description="API key for authenticating with EC2 agent",
     )
+    ec2_ping_timeout: float = Field(
+        default=2.0,
+        description="Timeout (seconds) for the startup reachability ping",
+    )
+    ec2_max_concurrency: int = Field(
+        default=8,
+        description="Max in-flight requests to the EC2 agent per worker",
+    )
+    ec2_max_test_runs: int = Field(
+        default=4,
+        description="Max concurrent test runs (execute/fix) on the EC2 agent per worker",
+    )
+    ec2_max_rps: float = Field(
+        default=0.0,
+        description="Max requests per second to the EC2 agent per worker (0 disables)",
+    )
+    ec2_max_retries: int = Field(
+        default=3,
+        description="Retries on HTTP 429 / connection errors, with exponential backoff",
+    )
 
     # ── LLM (Groq) ──
     groq_api_key: str = Field(
@@ -48,12 +76,26 @@ class ApiSettings(BaseSettings):
     )
     llm_max_tokens: int = Field(default=4096, description="Max tokens per LLM call")
     llm_temperature: float = Field(default=0.2, description="LLM temperature")
+    llm_cache_ttl: int = Field(
+        default=86400,
+        description="Seconds to reuse an LLM fix for an identical failure (0 disables)",
+    )
+    llm_cache_size: int = Field(default=512, description="Max cached LLM completions")
 
     # ── Agent ──
     max_iterations: int = Field(
         default=5,
         description="Max LangGraph healing iterations",
     )
+    pretty_results_json: bool = Field(
+        default=False,
+        description="Indent results.json (compact by default; also indented when DEBUG logging is on)",
+    )
+    result_cache_ttl: int = Field(
+        default=3600,
+        description="Seconds to reuse a passing run for the same repo HEAD (0 disables)",
+    )
+    result_cache_size: int = Field(default=1024, description="Max cached run results")
 
     @field_validator("log_level")
     @classmethod
@@ -67,5 +109,11 @@ class ApiSettings(BaseSettings):
     }
 
 
-# Global singleton
-api_settings = ApiSettings()
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_settings() -> ApiSettings:
+    """Build settings once per process (.env is parsed only on first call).
+
+    Every module reads settings through this accessor; tests can override them
+    with ``get_settings.cache_clear()`` before importing the app modules.
+    """
+    return ApiSettings()
@@ -0,0 +1,40 @@
+"""Response classes shared by the endpoints."""
+
+from typing import Any
+
+import msgspec
+from fastapi.responses import Response
+
+
+class MsgspecJSONResponse(Response):
+    """JSON response encoded with msgspec — used for msgspec.Struct payloads."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return msgspec.json.encode(content)
+
+
+def msgspec_openapi_schema(struct_type: type) -> dict[str, Any]:
+    """OpenAPI schema for a msgspec type, for a route's ``responses=`` entry.
+
+    FastAPI only documents Pydantic ``response_model``s, so routes returning
+    ``MsgspecJSONResponse`` declare their body with this. msgspec's
+    ``#/$defs/...`` references are inlined since they can't resolve inside
+    the OpenAPI document.
+    """
+    schema = msgspec.json.schema(struct_type)
+    defs = schema.pop("$defs", {})
+
+    def inline(node: Any) -> Any:
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if ref is not None:
+                rest = {k: inline(v) for k, v in node.items() if k != "$ref"}
+                return {**inline(defs[ref.rsplit("/", 1)[-1]]), **rest}
+            return {k: inline(v) for k, v in node.items()}
+        if isinstance(node, list):
+            return [inline(v) for v in node]
+        return node
+
+    return inline(schema)
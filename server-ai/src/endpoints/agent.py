@@ -1,24 +1,29 @@
 """Agent run endpoint — triggers the full healing pipeline."""
 
+import msgspec
 from fastapi import APIRouter
 
 from src.app.handlers import handle_endpoint
-from src.models import (
-    AgentRunRequest,
-    AgentRunResponse,
-    FixApplied,
-    CITimelineEntry,
-    ScoreBreakdown,
-    RunSummary,
-)
+from src.app.responses import MsgspecJSONResponse, msgspec_openapi_schema
+from src.models import AgentRunRequest, AgentRunResponse
 from src.runner.agent_runner import run_agent
 
 router = APIRouter(tags=["Agent"])
 
 
-@router.post("/agent/run", response_model=AgentRunResponse, status_code=202)
+@router.post(
+    "/agent/run",
+    response_class=MsgspecJSONResponse,
+    status_code=202,
+    responses={
+        202: {
+            "description": "Run finished",
+            "content": {"application/json": {"schema": msgspec_openapi_schema(AgentRunResponse)}},
+        },
+    },
+)
 @handle_endpoint
-async def agent_run(request: AgentRunRequest) -> AgentRunResponse:
+async def agent_run(request: AgentRunRequest) -> MsgspecJSONResponse:
     """
     Clone a GitHub repo, run the LangGraph healing loop,
     commit fixes to TEAM_NAME_LEADER_AI_Fix branch,
@@ -35,18 +40,7 @@ async def agent_run(request: AgentRunRequest) -> AgentRunResponse:
         max_iterations=request.max_iterations,
     )
 
-    return AgentRunResponse(
-        session_id=result["session_id"],
-        status=result["status"],
-        passed=result["passed"],
-        iterations=result["iterations"],
-        message=result["message"],
-        run_summary=RunSummary(**result["run_summary"]),
-        score_breakdown=ScoreBreakdown(**result["score_breakdown"]),
-        fixes_applied=[FixApplied(**f) for f in result["fixes_applied"]],
-        ci_timeline=[CITimelineEntry(**e) for e in result["ci_timeline"]],
-        commit_hash=result.get("commit_hash"),
-        branch_name=result.get("branch_name"),
-        errors_remaining=result.get("errors_remaining", []),
-        debug_trace=result.get("debug_trace", []),
-    )
+    # Validates the nested dicts into Structs (extra keys are ignored); lax mode
+    # coerces e.g. numeric strings the way the old Pydantic response_model did
+    response = msgspec.convert(result, AgentRunResponse, strict=False)
+    return MsgspecJSONResponse(response, status_code=202)
@@ -1,8 +1,8 @@
 """WebSocket endpoint for real-time agent pipeline streaming."""
 
-import json
 import logging
 
+import orjson
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
 from src.runner.streaming_runner import run_streaming
@@ -12,6 +12,11 @@ logger = logging.getLogger("rift_server")
 router = APIRouter(tags=["Agent WebSocket"])
 
 
+def _dumps(event: dict) -> str:
+    """Encode an event for a text frame (orjson, same compact output as send_json)."""
+    return orjson.dumps(event, default=str).decode()
+
+
 @router.websocket("/agent/ws")
 async def agent_websocket(websocket: WebSocket):
     """
@@ -24,10 +29,12 @@ async def agent_websocket(websocket: WebSocket):
     2. Server streams events back as JSON messages:
        - ``{ type: "step", step, status }``                   — pipeline step status change
        - ``{ type: "log", line, ts }``                        — build log line
+       - ``{ type: "llm_token", delta }``                     — AI output chunk, appended to the last log line
        - ``{ type: "iteration", iteration, total, status }``  — iteration result
        - ``{ type: "fix", fix: {...} }``                      — fix applied/failed
        - ``{ type: "complete", result: {...} }``              — final result
        - ``{ type: "error", message }``                       — fatal error
+       - ``{ type: "batch", events: [...] }``                 — several of the above, in order
     3. Server closes the connection after ``complete`` or ``error``.
     """
     await websocket.accept()
@@ -35,12 +42,12 @@ async def agent_websocket(websocket: WebSocket):
 
     try:
         raw = await websocket.receive_text()
-        config = json.loads(raw)
+        config = orjson.loads(raw)
         logger.info(f"[WS] Config received: repo_url={config.get('repo_url')}")
 
         async def send_event(event: dict) -> None:
             try:
-                await websocket.send_json(event)
+                await websocket.send_text(_dumps(event))
             except Exception as exc:
                 logger.warning(f"[WS] send failed: {exc}")
 
@@ -57,15 +64,15 @@ async def agent_websocket(websocket: WebSocket):
             log=send_event,
         )
 
-        await websocket.send_json({"type": "complete", "result": result})
+        await websocket.send_text(_dumps({"type": "complete", "result": result}))
         logger.info(f"[WS] Pipeline complete: passed={result.get('passed')}")
 
     except WebSocketDisconnect:
         logger.info("[WS] Client disconnected")
-    except json.JSONDecodeError as exc:
+    except orjson.JSONDecodeError as exc:
         logger.error(f"[WS] Invalid JSON from client: {exc}")
         try:
-            await websocket.send_json({"type": "error", "message": "Invalid JSON config"})
+            await websocket.send_text(_dumps({"type": "error", "message": "Invalid JSON config"}))
         except Exception:
             pass
     except Exception as exc:
@@ -75,7 +82,7 @@ async def agent_websocket(websocket: WebSocket):
         raw = str(exc)
         clean = raw.split("]: ", 1)[-1].strip() if "]: " in raw else raw
         try:
-            await websocket.send_json({"type": "error", "message": clean})
+            await websocket.send_text(_dumps({"type": "error", "message": clean}))
         except Exception:
             pass
     finally:
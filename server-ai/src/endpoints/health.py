@@ -1,19 +1,29 @@
 """Health endpoint."""
 
-from fastapi import APIRouter
+import orjson
+from fastapi import APIRouter, Request, Response
 
-from src.app.config import api_settings
+from src.app.config import get_settings
 from src.app.handlers import handle_endpoint
 
 router = APIRouter(tags=["Health"])
 
+# Pre-encoded bodies, one per ec2_reachable state — the probe does no serialization.
+_settings = get_settings()
+_HEALTH_BODIES: dict[bool | None, bytes] = {
+    reachable: orjson.dumps({
+        "status": "healthy",
+        "service": _settings.app_name,
+        "version": _settings.version,
+        "ec2_reachable": reachable,
+    })
+    for reachable in (True, False, None)
+}
+
 
 @router.get("/health")
 @handle_endpoint
-async def health_check() -> dict:
-    """Liveness probe."""
-    return {
-        "status": "healthy",
-        "service": api_settings.app_name,
-        "version": api_settings.version,
-    }
+async def health_check(request: Request) -> Response:
+    """Liveness probe. ``ec2_reachable`` is the cached startup ping (None while pending)."""
+    reachable = getattr(request.app.state, "ec2_reachable", None)
+    return Response(content=_HEALTH_BODIES[reachable], media_type="application/json")
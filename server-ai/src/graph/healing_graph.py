@@ -1,5 +1,7 @@
 """healing_graph — LangGraph pipeline that iteratively tests and fixes a repository."""
 
+from functools import lru_cache
+
 from langgraph.graph import StateGraph, END
 
 from src.state.graph_state import GraphState
@@ -8,6 +10,15 @@ from src.nodes.select_error import select_error
 from src.nodes.fix_code import fix_code
 
 
+def decide(state: GraphState) -> str:
+    """Route after select_error: stop when passing or out of iterations, else fix."""
+    if state["passed"]:
+        return "end"
+    if state.get("iteration", 0) >= state.get("max_iterations", 5):
+        return "end"
+    return "fix"
+
+
 def build_graph():
     """Build and compile the healing state graph."""
 
@@ -19,14 +30,6 @@ def build_graph():
 
     builder.set_entry_point("execute_tests")
     builder.add_edge("execute_tests", "select_error")
-
-    def decide(state: GraphState) -> str:
-        if state["passed"]:
-            return "end"
-        if state.get("iteration", 0) >= state.get("max_iterations", 5):
-            return "end"
-        return "fix"
-
     builder.add_conditional_edges(
         "select_error",
         decide,
@@ -36,3 +39,13 @@ def build_graph():
     builder.add_edge("fix_code", "execute_tests")
 
     return builder.compile()
+
+
+@lru_cache(maxsize=1)
+def get_graph():
+    """Compiled graph, built on first use and shared by every run.
+
+    The graph is stateless — all run data lives in the state dict passed to
+    ainvoke — so one instance per process is safe.
+    """
+    return build_graph()
@@ -1,5 +1,5 @@
 """LLM package."""
 
-from src.llm.llm_client import ask_llm
+from src.llm.llm_client import ask_llm_async, ask_llm_stream
 
-__all__ = ["ask_llm"]
+__all__ = ["ask_llm_async", "ask_llm_stream"]
@@ -0,0 +1,69 @@
+"""LLM response cache — skip the model call for failures we've already fixed."""
+
+import hashlib
+import logging
+
+from cachetools import TTLCache
+
+from src.app.config import get_settings
+
+logger = logging.getLogger("rift_server")
+
+
+def _digest(*parts: str) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8", "surrogatepass"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def failure_signature(bug_type: str, file_path: str, error_message: str, *contents: str) -> str:
+    """
+    Stable key for "the same failure on the same code".
+
+    The full prompt also embeds the raw test output, which carries volatile
+    noise (timings, PIDs, temp paths) — so identical failures rarely produce
+    identical prompts.  This key uses only the error identity plus a hash of
+    the file contents the fix is based on.
+    """
+    return _digest(bug_type, file_path, error_message.strip(), *contents)
+
+
+class LLMCache:
+    """
+    In-process, two-tier exact-match cache of LLM completions.
+
+    * prompt tier — sha256 of the full prompt
+    * signature tier — caller-supplied ``failure_signature`` (optional)
+
+    Both tiers share one TTL/size-bounded store.  A non-positive ``ttl``
+    disables the cache.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.enabled = ttl > 0
+        self._store: TTLCache = TTLCache(maxsize=maxsize, ttl=max(ttl, 1))
+
+    def get(self, prompt: str, signature: str | None = None) -> str | None:
+        if not self.enabled:
+            return None
+        hit = self._store.get("p:" + _digest(prompt))
+        if hit is None and signature:
+            hit = self._store.get("s:" + signature)
+        if hit is not None:
+            logger.info("[LLM-CACHE] hit")
+        return hit
+
+    def put(self, prompt: str, completion: str, signature: str | None = None) -> None:
+        if not self.enabled:
+            return
+        self._store["p:" + _digest(prompt)] = completion
+        if signature:
+            self._store["s:" + signature] = completion
+
+
+llm_cache = LLMCache(
+    maxsize=get_settings().llm_cache_size,
+    ttl=get_settings().llm_cache_ttl,
+)
@@ -1,38 +1,56 @@
 """LLM client — Groq for code repair."""
 
 import logging
+import re
+import time
+from typing import Any, AsyncIterator
 
-from groq import Groq
+from groq import AsyncGroq
 
-from src.app.config import api_settings
+from src.app.config import get_settings
 from src.core.exceptions import LLMError
 
 logger = logging.getLogger("rift_server")
 
-_client: Groq | None = None
+_async_client: AsyncGroq | None = None
+
+# Settings are fixed for the process lifetime — bind the per-call values once.
+_settings = get_settings()
+_MODEL = _settings.llm_model
+_TEMP = _settings.llm_temperature
+_MAX = _settings.llm_max_tokens
+
+_SYSTEM_MSG = {
+    "role": "system",
+    "content": (
+        "You are a senior software engineer fixing CI test failures. "
+        "Return ONLY the complete corrected file contents. "
+        "Do not include any explanation, markdown fences, or commentary. "
+        "Just the raw code."
+    ),
+}
+
+
+def _get_async_client() -> AsyncGroq:
+    """Lazy-initialised async Groq client."""
+    global _async_client
+    if _async_client is None:
+        api_key = get_settings().groq_api_key
+        if not api_key:
+            raise LLMError("SERVER_GROQ_API_KEY is not set — cannot call LLM")
+        _async_client = AsyncGroq(api_key=api_key)
+    return _async_client
 
 
-def _get_client() -> Groq:
-    """Lazy-initialised Groq client."""
-    global _client
-    if _client is None:
-        if not api_settings.groq_api_key:
-            raise LLMError("SERVER_GROQ_API_KEY is not set — cannot call LLM")
-        _client = Groq(api_key=api_settings.groq_api_key)
-    return _client
+# Optional opening fence line (```python etc.) and optional closing fence
+_FENCE_RE = re.compile(r"\A```[^\n]*\n?(.*?)(?:```)?\Z", re.DOTALL)
 
 
 def _clean_output(text: str) -> str:
     """Strip markdown code fences returned by LLM."""
     text = text.strip()
     if text.startswith("```"):
-        lines = text.split("\n")
-        # Remove first line (```python etc.)
-        lines = lines[1:]
-        # Remove closing ```
-        if lines and lines[-1].strip() == "```":
-            lines = lines[:-1]
-        text = "\n".join(lines)
+        text = _FENCE_RE.match(text).group(1)
     return text.strip()
 
 
@@ -41,53 +59,81 @@ def clean_code_fences(text: str) -> str:
     return _clean_output(text)
 
 
-def ask_llm(prompt: str) -> str:
+def _log_request(prompt: str) -> None:
+    logger.info("\n" + "#"*60)
+    logger.info("[LLM-REQ] Groq chat.completions.create")
+    logger.info(f"[LLM-REQ] model={_MODEL}  max_tokens={_MAX}  temp={_TEMP}")
+    logger.info(f"[LLM-REQ] PROMPT ({len(prompt)} chars):\n{prompt}")
+    logger.info("#"*60)
+
+
+def _handle_response(response: Any, elapsed: float) -> str:
+    content = response.choices[0].message.content
+    usage = response.usage
+    logger.info("\n" + "-"*60)
+    logger.info(f"[LLM-RES] Groq response ({elapsed:.0f}ms)")
+    logger.info(f"[LLM-RES] usage: prompt_tokens={usage.prompt_tokens}  completion_tokens={usage.completion_tokens}  total={usage.total_tokens}")
+    logger.info(f"[LLM-RES] OUTPUT ({len(content)} chars):\n{content[:1000]}{'...<truncated>' if len(content) > 1000 else ''}")
+    logger.info("-"*60)
+    return _clean_output(content)
+
+
+async def ask_llm_async(prompt: str) -> str:
     """
     Send a code-repair prompt to Groq LLM and return the fixed code.
 
+    Awaits the Groq request without blocking the event loop.
     Raises LLMError on failure.
     """
-    client = _get_client()
-
-    logger.info("\n" + "#"*60)
-    logger.info("[LLM-REQ] Groq chat.completions.create")
-    logger.info(f"[LLM-REQ] model={api_settings.llm_model}  max_tokens={api_settings.llm_max_tokens}  temp={api_settings.llm_temperature}")
-    logger.info(f"[LLM-REQ] PROMPT ({len(prompt)} chars):\n{prompt}")
-    logger.info("#"*60)
+    client = _get_async_client()
+    _log_request(prompt)
 
     try:
-        import time as _time
-        t0 = _time.monotonic()
-        response = client.chat.completions.create(
-            model=api_settings.llm_model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a senior software engineer fixing CI test failures. "
-                        "Return ONLY the complete corrected file contents. "
-                        "Do not include any explanation, markdown fences, or commentary. "
-                        "Just the raw code."
-                    ),
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=api_settings.llm_temperature,
-            max_tokens=api_settings.llm_max_tokens,
+        t0 = time.monotonic()
+        response = await client.chat.completions.create(
+            model=_MODEL,
+            messages=[_SYSTEM_MSG, {"role": "user", "content": prompt}],
+            temperature=_TEMP,
+            max_tokens=_MAX,
         )
-        elapsed = (_time.monotonic() - t0) * 1000
-
-        content = response.choices[0].message.content
-        usage = response.usage
-        logger.info("\n" + "-"*60)
-        logger.info(f"[LLM-RES] Groq response ({elapsed:.0f}ms)")
-        logger.info(f"[LLM-RES] usage: prompt_tokens={usage.prompt_tokens}  completion_tokens={usage.completion_tokens}  total={usage.total_tokens}")
-        logger.info(f"[LLM-RES] OUTPUT ({len(content)} chars):\n{content[:1000]}{'...<truncated>' if len(content) > 1000 else ''}")
-        logger.info("-"*60)
-        return _clean_output(content)
+        return _handle_response(response, (time.monotonic() - t0) * 1000)
 
     except LLMError:
         raise
     except Exception as e:
         logger.error(f"[LLM-ERR] LLM call failed: {e}")
         raise LLMError(f"LLM call failed: {e}")
+
+
+async def ask_llm_stream(prompt: str) -> AsyncIterator[str]:
+    """
+    Streaming ``ask_llm_async`` — yields raw completion deltas as they arrive.
+
+    The deltas are NOT fence-cleaned; join them and pass the result through
+    ``clean_code_fences``.  Raises LLMError on failure.
+    """
+    client = _get_async_client()
+    _log_request(prompt)
+
+    try:
+        t0 = time.monotonic()
+        stream = await client.chat.completions.create(
+            model=_MODEL,
+            messages=[_SYSTEM_MSG, {"role": "user", "content": prompt}],
+            temperature=_TEMP,
+            max_tokens=_MAX,
+            stream=True,
+        )
+        total = 0
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                total += len(delta)
+                yield delta
+        logger.info("[LLM-RES] Groq stream done (%.0fms, %d chars)", (time.monotonic() - t0) * 1000, total)
+
+    except LLMError:
+        raise
+    except Exception as e:
+        logger.error("[LLM-ERR] LLM stream failed: %s", e)
+        raise LLMError(f"LLM stream failed: {e}")
@@ -1,7 +1,17 @@
-"""Pydantic models for the RIFT 2026 Hackathon agent."""
+"""Models for the RIFT 2026 Hackathon agent.
+
+The request is a Pydantic model so FastAPI can validate it and document it in
+OpenAPI. Response models are ``msgspec.Struct`` — they are built once per run
+and can carry large ``errors_remaining`` / ``debug_trace`` lists, which msgspec
+encodes much faster than Pydantic (see ``MsgspecJSONResponse``).
+"""
 
 from __future__ import annotations
 
+from typing import Annotated
+
+import msgspec
+from msgspec import Meta
 from pydantic import BaseModel, Field
 
 
@@ -22,63 +32,63 @@ class AgentRunRequest(BaseModel):
 
 # ── Sub-models for response ──────────────────────────────────────────────────
 
-class FixApplied(BaseModel):
+class FixApplied(msgspec.Struct):
     """One row in the Fixes Applied table."""
 
-    file: str = Field(..., description="File path that was fixed")
-    bug_type: str = Field(..., description="LINTING | SYNTAX | LOGIC | TYPE_ERROR | IMPORT | INDENTATION")
-    line_number: int | None = Field(default=None, description="Line number of the error")
-    commit_message: str = Field(default="", description="Commit message for this fix")
-    status: str = Field(default="fixed", description="fixed | failed")
+    file: Annotated[str, Meta(description="File path that was fixed")]
+    bug_type: Annotated[str, Meta(description="LINTING | SYNTAX | LOGIC | TYPE_ERROR | IMPORT | INDENTATION")]
+    line_number: Annotated[int | None, Meta(description="Line number of the error")] = None
+    commit_message: Annotated[str, Meta(description="Commit message for this fix")] = ""
+    status: Annotated[str, Meta(description="fixed | failed")] = "fixed"
 
 
-class CITimelineEntry(BaseModel):
+class CITimelineEntry(msgspec.Struct):
     """One row in the CI/CD Timeline."""
 
-    iteration: int = Field(..., description="Iteration number (1-indexed)")
-    status: str = Field(..., description="passed | failed")
-    errors_count: int = Field(default=0, description="Number of errors in this run")
-    fixes_applied: int = Field(default=0, description="Fixes applied in this iteration")
-    timestamp: str = Field(default="", description="ISO timestamp of this run")
+    iteration: Annotated[int, Meta(description="Iteration number (1-indexed)")]
+    status: Annotated[str, Meta(description="passed | failed")]
+    errors_count: Annotated[int, Meta(description="Number of errors in this run")] = 0
+    fixes_applied: Annotated[int, Meta(description="Fixes applied in this iteration")] = 0
+    timestamp: Annotated[str, Meta(description="ISO timestamp of this run")] = ""
 
 
-class ScoreBreakdown(BaseModel):
+class ScoreBreakdown(msgspec.Struct):
     """Score breakdown per hackathon rules."""
 
-    base_score: int = Field(default=100)
-    speed_bonus: int = Field(default=0, description="+10 if < 5 minutes")
-    efficiency_penalty: int = Field(default=0, description="-2 per commit over 20")
-    total_commits: int = Field(default=0)
-    final_score: int = Field(default=100)
+    base_score: int = 100
+    speed_bonus: Annotated[int, Meta(description="+10 if < 5 minutes")] = 0
+    efficiency_penalty: Annotated[int, Meta(description="-2 per commit over 20")] = 0
+    total_commits: int = 0
+    final_score: int = 100
 
 
-class RunSummary(BaseModel):
+class RunSummary(msgspec.Struct):
     """Run summary card for the dashboard."""
 
     repo_url: str
     team_name: str
     team_leader_name: str
-    branch_name: str = Field(default="", description="TEAM_NAME_LEADER_AI_Fix")
-    total_failures: int = Field(default=0)
-    total_fixes: int = Field(default=0)
-    final_status: str = Field(default="FAILED", description="PASSED or FAILED")
-    time_taken_seconds: float = Field(default=0.0)
+    branch_name: Annotated[str, Meta(description="TEAM_NAME_LEADER_AI_Fix")] = ""
+    total_failures: int = 0
+    total_fixes: int = 0
+    final_status: Annotated[str, Meta(description="PASSED or FAILED")] = "FAILED"
+    time_taken_seconds: float = 0.0
 
 
 # ── Response ─────────────────────────────────────────────────────────────────
 
-class AgentRunResponse(BaseModel):
+class AgentRunResponse(msgspec.Struct):
     """Full response for POST /agent/run — everything the dashboard needs."""
 
     session_id: str
-    status: str = Field(..., description="passed | failed | partial_fix")
+    status: Annotated[str, Meta(description="passed | failed | partial_fix")]
     passed: bool
     iterations: int
-    message: str = ""
 
     # Dashboard sections
     run_summary: RunSummary
     score_breakdown: ScoreBreakdown
+    message: str = ""
     fixes_applied: list[FixApplied] = []
     ci_timeline: list[CITimelineEntry] = []
 
@@ -88,4 +98,6 @@ class AgentRunResponse(BaseModel):
     errors_remaining: list[dict] = []
 
     # Full debug trace: every API call with request + response payloads
-    debug_trace: list[dict] = Field(default_factory=list, description="Ordered list of API call events")
+    debug_trace: Annotated[list[dict], Meta(description="Ordered list of API call events")] = []
+
+    cached: Annotated[bool, Meta(description="True when served from an earlier identical run")] = False
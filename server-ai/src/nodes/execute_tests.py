@@ -3,6 +3,7 @@
 import logging
 import time
 from datetime import datetime, timezone
+from typing import Any
 
 from src.state.graph_state import GraphState
 from src.services.ec2_client import EC2Client
@@ -10,10 +11,13 @@ from src.services.ec2_client import EC2Client
 logger = logging.getLogger("rift_server")
 
 
-async def execute_tests(state: GraphState) -> GraphState:
-    """Run tests via the EC2 agent, update state, and record CI timeline entry."""
+async def execute_tests(state: GraphState) -> dict[str, Any]:
+    """Run tests via the EC2 agent and record a CI timeline entry.
 
-    iteration = state.get("iteration", 0) + 1
+    Returns only the keys it changes; LangGraph merges them into the state.
+    """
+
+    iteration = state["iteration"] + 1
     logger.info(f"\n{'*'*60}")
     logger.info(f"[GRAPH] execute_tests  iteration={iteration}")
     logger.info(f"[GRAPH] session_id={state['session_id']}  branch={state.get('branch','main')}")
@@ -45,32 +49,26 @@ async def execute_tests(state: GraphState) -> GraphState:
         for i, e in enumerate(errors):
             logger.info(f"[GRAPH]   error[{i}]: {e.get('error_type')} in {e.get('file')} line {e.get('line')} — {e.get('message','')[:120]}")
 
-    state["errors"] = errors
-    state["passed"] = passed
-    state["iteration"] = iteration
-    state["raw_output"] = result.get("raw_output", "")
-
     # Track total unique failures detected (on first run)
     if iteration == 1:
-        state["total_failures_detected"] = len(errors)
-    elif len(errors) > state.get("total_failures_detected", 0):
-        state["total_failures_detected"] = len(errors)
+        total_failures = len(errors)
+    else:
+        total_failures = max(len(errors), state["total_failures_detected"])
 
-    # Record CI timeline entry
-    fixes_so_far = len(state.get("fixes_applied", []))
-    timeline: list = state.get("ci_timeline", [])
+    # Record CI timeline entry (slots are preallocated by run_agent, one per iteration)
+    fixes_so_far = iteration - 1  # fix_code records exactly one fix per earlier iteration
     ts = datetime.now(timezone.utc).isoformat()
-    timeline.append({
+    ci_timeline = state["ci_timeline"]
+    ci_timeline[iteration - 1] = {
         "iteration": iteration,
         "status": "passed" if passed else "failed",
         "errors_count": len(errors),
         "fixes_applied": fixes_so_far,
         "timestamp": ts,
-    })
-    state["ci_timeline"] = timeline
+    }
 
     # Append to debug trace
-    trace: list = state.get("debug_trace", [])
+    trace = state["debug_trace"]
     trace.append({
         "stage": "execute_tests",
         "iteration": iteration,
@@ -87,6 +85,13 @@ async def execute_tests(state: GraphState) -> GraphState:
         },
         "summary": f"{'PASSED' if passed else 'FAILED'} — {len(errors)} error(s)",
     })
-    state["debug_trace"] = trace
 
-    return state
+    return {
+        "errors": errors,
+        "passed": passed,
+        "iteration": iteration,
+        "raw_output": result.get("raw_output", ""),
+        "total_failures_detected": total_failures,
+        "ci_timeline": ci_timeline,
+        "debug_trace": trace,
+    }
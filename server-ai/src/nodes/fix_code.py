@@ -3,26 +3,33 @@
 import logging
 import time
 from datetime import datetime, timezone
+from typing import Any
 
 from src.state.graph_state import GraphState
-from src.llm.llm_client import ask_llm, clean_code_fences
+from src.llm.llm_client import ask_llm_async, clean_code_fences
 from src.services.ec2_client import EC2Client
 
 logger = logging.getLogger("rift_server")
 
+# Trace tails carry the actionable error; cap what we resend to the LLM.
+_MAX_TRACE_LINES = 50
 
-async def fix_code(state: GraphState) -> GraphState:
-    """Generate a fix with the LLM, apply it, and record in fixes_applied."""
+
+async def fix_code(state: GraphState) -> dict[str, Any]:
+    """Generate a fix with the LLM, apply it, and record in fixes_applied.
+
+    Returns only the keys it changes; LangGraph merges them into the state.
+    """
 
     if state["passed"]:
-        return state
+        return {}
 
     error = state["current_error"]
     file_path = error.get("file", "unknown")
     bug_type = error.get("error_type", "LOGIC")
     line_number = error.get("line")
     error_message = error.get("message", "")
-    iteration = state.get("iteration", 0)
+    iteration = state["iteration"]
 
     logger.info(f"\n{'~'*60}")
     logger.info(f"[GRAPH] fix_code  iteration={iteration}")
@@ -87,6 +94,10 @@ async def fix_code(state: GraphState) -> GraphState:
         impl_ext = impl_file_path.rsplit(".", 1)[-1] if "." in impl_file_path else ""
         impl_block = f"\n\n=== IMPLEMENTATION FILE ({impl_file_path}) ===\n```{impl_ext}\n{impl_file_content}\n```"
 
+    full_trace = error.get("full_trace") or ""
+    if full_trace:
+        full_trace = "\n".join(full_trace.splitlines()[-_MAX_TRACE_LINES:])
+
     test_output_block = f"```\n{raw_output[:3000]}{'...<truncated>' if len(raw_output) > 3000 else ''}\n```" if raw_output else "(no test output available)"
 
     test_file_hint = (
@@ -107,7 +118,7 @@ Language: {language}
 Error Type: {bug_type}
 Line: {line_number or 'unknown'}
 Message: {error_message}
-Full Trace: {error.get('full_trace') or 'None'}
+Full Trace: {full_trace or 'None'}
 {test_file_hint}
 === TEST FILE CONTENTS ({file_path}) ===
 {file_block}{impl_block}
@@ -119,7 +130,7 @@ Return ONLY the complete corrected file contents with no explanation, no markdow
 
     # ── LLM call ──
     t_llm = time.monotonic()
-    raw_fixed = ask_llm(prompt)
+    raw_fixed = await ask_llm_async(prompt)
     llm_ms = (time.monotonic() - t_llm) * 1000
 
     # Check if LLM redirected to a different file (for test-file errors)
@@ -167,26 +178,24 @@ Return ONLY the complete corrected file contents with no explanation, no markdow
     if line_number:
         commit_msg += f" at line {line_number}"
 
-    # Record in fixes_applied
-    fixes: list = state.get("fixes_applied", [])
-    fixes.append({
+    # Record in fixes_applied (preallocated slot for this iteration)
+    fixes_applied = state["fixes_applied"]
+    fixes_applied[iteration - 1] = {
         "file": actual_file_path,
         "bug_type": bug_type,
         "line_number": line_number,
         "commit_message": commit_msg,
         "status": "fixed" if fix_success else "failed",
-    })
-    state["fixes_applied"] = fixes
+    }
 
     # Track unique fixed files
-    fixed_files: list[str] = state.get("fixed_files", [])
+    fixed_files = state["fixed_files"]
     if actual_file_path not in fixed_files:
         fixed_files.append(actual_file_path)
-    state["fixed_files"] = fixed_files
 
     # Append to debug trace
     ts = datetime.now(timezone.utc).isoformat()
-    trace: list = state.get("debug_trace", [])
+    trace = state["debug_trace"]
     trace.append({
         "stage": "fix_code",
         "iteration": iteration,
@@ -209,6 +218,5 @@ Return ONLY the complete corrected file contents with no explanation, no markdow
         },
         "summary": f"{'OK' if fix_success else 'FAILED'} — fixed {actual_file_path} ({bug_type})",
     })
-    state["debug_trace"] = trace
 
-    return state
+    return {"fixes_applied": fixes_applied, "fixed_files": fixed_files, "debug_trace": trace}
@@ -1,13 +1,14 @@
 """select_error node — picks the first unresolved error to fix next."""
 
+from typing import Any
+
 from src.state.graph_state import GraphState
 
 
-async def select_error(state: GraphState) -> GraphState:
+async def select_error(state: GraphState) -> dict[str, Any]:
     """Set current_error to the first error in the list."""
 
     if state["passed"] or not state["errors"]:
-        return state
+        return {}
 
-    state["current_error"] = state["errors"][0]
-    return state
+    return {"current_error": state["errors"][0]}
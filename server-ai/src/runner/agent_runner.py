@@ -1,19 +1,74 @@
 """agent_runner — full orchestration: session → graph → commit → score → results.json."""
 
-import json
+import asyncio
 import logging
+import os
 import re
+import string
 import time
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Final
 
-from src.app.config import api_settings
-from src.graph.healing_graph import build_graph
+import orjson
+from cachetools import TTLCache
+
+from src.app.config import get_settings
+from src.graph.healing_graph import get_graph
 from src.services.ec2_client import EC2Client
 
 logger = logging.getLogger("rift_server")
 
+# Background results.json writes and session cleanups — strong refs so the
+# tasks aren't GC'd mid-flight
+_pending_writes: set[asyncio.Task] = set()
+
+# Results of passing runs, keyed by repo + upstream commit + run parameters
+_result_cache: TTLCache = TTLCache(
+    maxsize=get_settings().result_cache_size,
+    ttl=max(1, get_settings().result_cache_ttl),
+)
+
+_BANNER = "@" * 60
+
+# Settings are built once per process (get_settings is cached), so bind at import
+_DEFAULT_MAX_ITER: Final[int] = get_settings().max_iterations
+
+# Immutable per-run defaults of the graph state; run_agent copies this and
+# fills in the run inputs plus fresh mutable lists.
+_INITIAL_STATE_TEMPLATE: Final[dict[str, Any]] = {
+    "session_id": None,   # filled in once session_task resolves
+    "passed": False,
+    "current_error": None,
+    "iteration": 0,
+    "total_failures_detected": 0,
+    "commit_hash": None,
+    "raw_output": "",
+}
+
+_BRANCH_CLEAN_RE = re.compile(r"[^A-Z0-9_]")
+# ASCII fast path: one str.translate pass that uppercases, maps space → "_"
+# and deletes everything outside [A-Z0-9_]
+_BRANCH_KEEP = frozenset(string.ascii_uppercase + string.digits + "_")
+_BRANCH_TABLE: Final[dict[int, int | None]] = {
+    i: (
+        ord("_") if c == " "
+        else ord(c.upper()) if c in string.ascii_lowercase
+        else i if c in _BRANCH_KEEP
+        else None
+    )
+    for i, c in ((i, chr(i)) for i in range(128))
+}
+
+
+def _clean(s: str) -> str:
+    """Uppercase, spaces → underscores, drop anything outside [A-Z0-9_]."""
+    if s.isascii():
+        return s.translate(_BRANCH_TABLE)
+    # Non-ASCII can uppercase into ASCII (e.g. "ß" → "SS"), so keep the full path
+    return _BRANCH_CLEAN_RE.sub("", s.upper().replace(" ", "_"))
+
 
 def _make_branch_name(team_name: str, leader_name: str) -> str:
     """
@@ -21,8 +76,77 @@ def _make_branch_name(team_name: str, leader_name: str) -> str:
     All UPPERCASE, spaces → underscores, ends with _AI_Fix.
     e.g. "RIFT ORGANISERS" + "Saiyam Kumar" → "RIFT_ORGANISERS_SAIYAM_KUMAR_AI_Fix"
     """
-    clean = lambda s: re.sub(r"[^A-Z0-9_]", "", s.upper().replace(" ", "_"))
-    return f"{clean(team_name)}_{clean(leader_name)}_AI_Fix"
+    return "_".join((_clean(team_name), _clean(leader_name), "AI_Fix"))
+
+
+async def _upstream_sha(repo_url: str, branch: str) -> str | None:
+    """Current head commit of `branch` on the remote via `git ls-remote`, or None if unknown."""
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "git", "ls-remote", repo_url, f"refs/heads/{branch}",
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            # Fail fast on private/misspelled repos instead of waiting on a credential prompt
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+        )
+        try:
+            stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=10)
+        except asyncio.TimeoutError:
+            proc.kill()
+            return None
+    except OSError as e:
+        logger.warning("[RUNNER] git ls-remote unavailable: %s", e)
+        return None
+    if proc.returncode != 0 or not stdout:
+        return None
+    return stdout.split(maxsplit=1)[0].decode()
+
+
+async def _discard_session(client: EC2Client, session_task: asyncio.Task) -> None:
+    """Delete the session started for a run that was then served from the cache."""
+    try:
+        session = await session_task
+        await client.delete_session(session["session_id"])
+    except Exception as e:
+        logger.warning("[RUNNER] could not discard unused session: %s", e)
+
+
+def _spawn(coro) -> None:
+    """Run `coro` in the background, tracked so shutdown can wait for it."""
+    task = asyncio.create_task(coro)
+    _pending_writes.add(task)
+    task.add_done_callback(_pending_writes.discard)
+
+
+async def _write_results(result: dict[str, Any]) -> None:
+    """Serialize and write results.json; failures are logged, never raised."""
+    try:
+        results_path = Path("results.json")
+        # Compact by default — consumers must not rely on indentation
+        pretty = get_settings().pretty_results_json or logger.isEnabledFor(logging.DEBUG)
+        option = orjson.OPT_INDENT_2 if pretty else 0
+        payload = orjson.dumps(result, default=str, option=option)
+        # Disk I/O off the event loop so concurrent runs aren't stalled
+        await asyncio.to_thread(results_path.write_bytes, payload)
+        if logger.isEnabledFor(logging.INFO):  # resolve() hits the filesystem
+            logger.info("run_agent: results.json written to %s", results_path.resolve())
+    except Exception as e:
+        logger.error("run_agent: failed to write results.json: %s", e)
+
+
+async def drain_pending_writes() -> None:
+    """Wait for in-flight results.json writes and session cleanups (called on shutdown)."""
+    if _pending_writes:
+        await asyncio.gather(*_pending_writes, return_exceptions=True)
+
+
+def _trim(slots: list) -> list:
+    """Drop the unused (trailing None) slots of a preallocated list."""
+    end = len(slots)
+    while end and slots[end - 1] is None:
+        end -= 1
+    return slots[:end]
 
 
 def _calculate_score(
@@ -44,6 +168,117 @@ def _calculate_score(
     }
 
 
+@dataclass(slots=True)
+class RunResult:
+    """Everything one agent run produced; to_dict() builds the response shape once."""
+
+    session_id: str
+    passed: bool
+    iterations: int
+    repo_url: str
+    team_name: str
+    team_leader_name: str
+    branch_name: str
+    total_failures: int
+    total_fixes: int
+    time_taken_seconds: float
+    score_breakdown: dict[str, Any]
+    fixes_applied: list[dict[str, Any]]
+    ci_timeline: list[dict[str, Any]]
+    commit_hash: str | None
+    errors_remaining: list[dict[str, Any]]
+    debug_trace: list[dict[str, Any]]
+
+    def to_dict(self) -> dict[str, Any]:
+        passed = self.passed
+        if passed:
+            status, message = "passed", "All tests passing."
+        else:
+            status = "partial_fix" if self.total_fixes > 0 else "failed"
+            message = f"{len(self.errors_remaining)} error(s) remain."
+        return {
+            "session_id": self.session_id,
+            "status": status,
+            "passed": passed,
+            "iterations": self.iterations,
+            "message": message,
+            "run_summary": {
+                "repo_url": self.repo_url,
+                "team_name": self.team_name,
+                "team_leader_name": self.team_leader_name,
+                "branch_name": self.branch_name,
+                "total_failures": self.total_failures,
+                "total_fixes": self.total_fixes,
+                "final_status": "PASSED" if passed else "FAILED",
+                "time_taken_seconds": round(self.time_taken_seconds, 2),
+            },
+            "score_breakdown": self.score_breakdown,
+            "fixes_applied": self.fixes_applied,
+            "ci_timeline": self.ci_timeline,
+            "commit_hash": self.commit_hash,
+            "branch_name": self.branch_name if self.commit_hash else None,
+            "errors_remaining": self.errors_remaining,
+            "debug_trace": self.debug_trace,
+            "cached": False,
+        }
+
+
+async def _commit_per_file(
+    client: EC2Client,
+    session_id: str,
+    commits: list[tuple[str, str]],
+    branch_name: str,
+    run_debug_trace: list[dict[str, Any]],
+) -> tuple[str | None, int]:
+    """Fallback: one commit_fix call per file, in order.
+
+    Sequential on purpose — every call commits and pushes to the same branch of
+    the same working tree, so concurrent calls would race on the git index and
+    the push. Returns (last commit hash, commit count). A failed file is logged
+    and traced without aborting the others.
+    """
+    commit_hash: str | None = None
+    total_commits = 0
+    for file_path, commit_msg in commits:
+        logger.info("[RUNNER] committing %s: %s", file_path, commit_msg)
+        t_commit = time.monotonic()
+        try:
+            commit_result = await client.commit_fix(
+                session_id=session_id,
+                file_path=file_path,
+                commit_message=commit_msg,
+                branch_name=branch_name,
+            )
+        except Exception as e:
+            logger.error("[RUNNER] commit failed for %s: %s", file_path, e)
+            run_debug_trace.append({
+                "stage": "commit_fix",
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "duration_ms": 0,
+                "request": {"file_path": file_path},
+                "response": {"error": str(e)},
+                "summary": f"FAILED — {file_path}: {e}",
+            })
+            continue
+        commit_ms = (time.monotonic() - t_commit) * 1000
+        logger.info(
+            "[RUNNER] commit: success=%s  hash=%s  (%.0fms)",
+            commit_result.get("success"), commit_result.get("commit_hash"), commit_ms,
+        )
+        if commit_result.get("success"):
+            commit_hash = commit_result.get("commit_hash") or commit_hash
+            total_commits += 1
+        run_debug_trace.append({
+            "stage": "commit_fix",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(commit_ms),
+            "request": {"session_id": session_id, "file_path": file_path, "commit_message": commit_msg, "branch_name": branch_name},
+            "response": commit_result,
+            "summary": f"commit {commit_result.get('commit_hash','?')[:8]} — {file_path}",
+        })
+    return commit_hash, total_commits
+
+
 async def run_agent(
     repo_url: str,
     language: str,
@@ -56,33 +291,82 @@ async def run_agent(
 ) -> dict[str, Any]:
     """
     End-to-end agent run:
-    1. Create EC2 session (clone repo).
+    1. Create EC2 session (clone repo); meanwhile look up the upstream HEAD and
+       return the cached result if it already passed with the same inputs.
     2. Run LangGraph healing loop (test → select → fix → repeat).
-    3. Commit each fixed file to branch TEAM_NAME_LEADER_AI_Fix.
+    3. Commit the fixed files to branch TEAM_NAME_LEADER_AI_Fix (one batched commit).
     4. Calculate score, build results.json.
     5. Return everything the dashboard needs.
     """
-    start_time = time.time()
+    start_time = time.monotonic()
+    max_iters = max(1, max_iterations or _DEFAULT_MAX_ITER)
+
     client = EC2Client()
     run_debug_trace: list[dict[str, Any]] = []  # collects non-graph stages
 
-    # ── 1. Branch name ──
-    branch_name = _make_branch_name(team_name, team_leader_name)
-    logger.info(f"\n{'@'*60}")
-    logger.info(f"[RUNNER] run_agent START")
-    logger.info(f"[RUNNER] repo_url={repo_url}")
-    logger.info(f"[RUNNER] language={language}  branch={branch}")
-    logger.info(f"[RUNNER] team={team_name}  leader={team_leader_name}")
-    logger.info(f"[RUNNER] branch_name={branch_name}")
-    logger.info(f"{'@'*60}")
-
-    # ── 2. Create session (clone repo) ──
-    logger.info(f"[RUNNER] ▶ STEP 1: create_session")
+    # ── 1. Create session (clone repo) — issued first so the clone RTT overlaps local setup ──
     t_session = time.monotonic()
-    session = await client.create_session(repo_url, language)
+    session_task = asyncio.create_task(client.create_session(repo_url, language))
+
+    # Upstream head for the result cache, looked up while the session is created
+    sha_task = (
+        asyncio.create_task(_upstream_sha(repo_url, branch))
+        if get_settings().result_cache_ttl > 0 else None
+    )
+
+    # ── 2. Branch name + initial state (no dependency on session_id) ──
+    branch_name = _make_branch_name(team_name, team_leader_name)
+    logger.info("\n%s", _BANNER)
+    logger.info("[RUNNER] run_agent START")
+    logger.info("[RUNNER] repo_url=%s", repo_url)
+    logger.info("[RUNNER] language=%s  branch=%s", language, branch)
+    logger.info("[RUNNER] team=%s  leader=%s", team_name, team_leader_name)
+    logger.info("[RUNNER] branch_name=%s", branch_name)
+    logger.info(_BANNER)
+    logger.info("[RUNNER] ▶ STEP 1: create_session")
+
+    initial_state = _INITIAL_STATE_TEMPLATE.copy()
+    initial_state.update(
+        repo_url=repo_url,
+        language=language,
+        branch=branch,
+        team_name=team_name,
+        team_leader_name=team_leader_name,
+        branch_name=branch_name,
+        install_command=install_command,
+        test_command=test_command,
+        max_iterations=max_iters,
+        # Fresh mutable containers (nodes mutate them in place); the slot lists are
+        # preallocated — nodes write entry N into slot N-1 instead of appending
+        fixes_applied=[None] * max_iters,
+        ci_timeline=[None] * max_iters,
+        errors=[],
+        fixed_files=[],
+        debug_trace=[],   # graph nodes will append to this
+    )
+
+    # Same repo at the same upstream commit → reuse the earlier passing result
+    cache_key: tuple | None = None
+    if sha_task is not None and (sha := await sha_task):
+        cache_key = (
+            repo_url, branch, sha, language, install_command, test_command,
+            max_iters, team_name, team_leader_name,
+        )
+        cached = _result_cache.get(cache_key)
+        if cached is not None:
+            logger.info("[RUNNER] cache hit for %s@%.8s — skipping run", repo_url, sha)
+            # The fresh session isn't needed; the cached run's session and trace are stale
+            _spawn(_discard_session(client, session_task))
+            return {**cached, "session_id": "", "debug_trace": [], "cached": True}
+
+    session = await session_task
     session_ms = (time.monotonic() - t_session) * 1000
     session_id: str = session["session_id"]
-    logger.info(f"[RUNNER] session created: id={session_id}  repo_path={session.get('repo_path')}  ({session_ms:.0f}ms)")
+    initial_state["session_id"] = session_id
+    logger.info(
+        "[RUNNER] session created: id=%s  repo_path=%s  (%.0fms)",
+        session_id, session.get("repo_path"), session_ms,
+    )
 
     run_debug_trace.append({
         "stage": "create_session",
@@ -93,133 +377,116 @@ async def run_agent(
         "summary": f"Session {session_id} created — repo cloned",
     })
 
-    # ── 3. Build & run the healing graph ──
-    logger.info(f"[RUNNER] ▶ STEP 2: LangGraph healing loop (max_iterations={max_iterations or api_settings.max_iterations})")
-    graph = build_graph()
-
-    initial_state: dict[str, Any] = {
-        "session_id": session_id,
-        "repo_url": repo_url,
-        "language": language,
-        "branch": branch,
-        "team_name": team_name,
-        "team_leader_name": team_leader_name,
-        "branch_name": branch_name,
-        "install_command": install_command,
-        "test_command": test_command,
-        "errors": [],
-        "passed": False,
-        "current_error": None,
-        "iteration": 0,
-        "max_iterations": max_iterations or api_settings.max_iterations,
-        "fixes_applied": [],
-        "ci_timeline": [],
-        "total_failures_detected": 0,
-        "fixed_files": [],
-        "commit_hash": None,
-        "raw_output": "",
-        "debug_trace": [],   # graph nodes will append to this
-    }
+    # ── 3. Run the (cached) healing graph ──
+    logger.info("[RUNNER] ▶ STEP 2: LangGraph healing loop (max_iterations=%d)", max_iters)
 
-    final_state: dict[str, Any] = await graph.ainvoke(initial_state)
+    final_state: dict[str, Any] = await get_graph().ainvoke(initial_state)
+    final_state["fixes_applied"] = _trim(final_state["fixes_applied"])
+    final_state["ci_timeline"] = _trim(final_state["ci_timeline"])
     logger.info(
-        f"[RUNNER] graph done: passed={final_state['passed']}  "
-        f"iters={final_state['iteration']}  fixes={len(final_state['fixes_applied'])}  "
-        f"trace_entries={len(final_state.get('debug_trace', []))}"
+        "[RUNNER] graph done: passed=%s  iters=%d  fixes=%d  trace_entries=%d",
+        final_state["passed"], final_state["iteration"],
+        len(final_state["fixes_applied"]), len(final_state.get("debug_trace", [])),
     )
 
     # ── 4. Commit all fixed files ──
-    logger.info(f"[RUNNER] ▶ STEP 3: committing fixed files ({len(final_state['fixed_files'])} files)")
     commit_hash: str | None = None
     total_commits = 0
 
-    if final_state["fixed_files"]:
-        for fix in final_state["fixes_applied"]:
-            if fix.get("status") != "fixed":
-                continue
-            file_path = fix["file"]
-            commit_msg = fix.get("commit_message", f"[AI-AGENT] Fix {file_path}")
-            logger.info(f"[RUNNER] committing {file_path}: {commit_msg}")
-            t_commit = time.monotonic()
-            try:
-                commit_result = await client.commit_fix(
-                    session_id=session_id,
-                    file_path=file_path,
-                    commit_message=commit_msg,
-                    branch_name=branch_name,
+    # Only successful fixes get committed; the same list doubles as the fix count
+    commits = [
+        (fix["file"], fix.get("commit_message", f"[AI-AGENT] Fix {fix['file']}"))
+        for fix in final_state["fixes_applied"]
+        if fix.get("status") == "fixed"
+    ]
+    total_fixes = len(commits)
+
+    if not commits:
+        # Nothing succeeded — skip the commit phase (and its remote branch creation)
+        logger.info("[RUNNER] ▶ STEP 3: no successful fixes — skipping commit")
+    else:
+        logger.info("[RUNNER] ▶ STEP 3: committing fixed files (%d fixes)", total_fixes)
+        # One RPC → one git add/commit/push on the agent, instead of N round-trips
+        logger.info("[RUNNER] committing %d fix(es) in one batch", total_fixes)
+        t_commit = time.monotonic()
+        try:
+            batch_result = await client.commit_fixes_batch(
+                session_id=session_id,
+                fixes=commits,
+                branch_name=branch_name,
+            )
+        except Exception as e:
+            logger.error("[RUNNER] batch commit failed: %s", e)
+            run_debug_trace.append({
+                "stage": "commit_fixes_batch",
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "duration_ms": 0,
+                "request": {"files": [f for f, _ in commits]},
+                "response": {"error": str(e)},
+                "summary": f"FAILED — batch commit: {e}",
+            })
+        else:
+            if batch_result is None:
+                # Older agent without /commit/batch
+                commit_hash, total_commits = await _commit_per_file(
+                    client, session_id, commits, branch_name, run_debug_trace,
                 )
+            else:
                 commit_ms = (time.monotonic() - t_commit) * 1000
-                logger.info(f"[RUNNER] commit: success={commit_result.get('success')}  hash={commit_result.get('commit_hash')}  ({commit_ms:.0f}ms)")
-                if commit_result.get("success"):
-                    commit_hash = commit_result.get("commit_hash")
-                    total_commits += 1
+                logger.info(
+                    "[RUNNER] batch commit: success=%s  hash=%s  (%.0fms)",
+                    batch_result.get("success"), batch_result.get("commit_hash"), commit_ms,
+                )
+                if batch_result.get("success"):
+                    commit_hash = batch_result.get("commit_hash")
+                    total_commits = batch_result.get("total_commits", 1)
                 run_debug_trace.append({
-                    "stage": "commit_fix",
+                    "stage": "commit_fixes_batch",
                     "timestamp": datetime.now(timezone.utc).isoformat(),
                     "duration_ms": round(commit_ms),
-                    "request": {"session_id": session_id, "file_path": file_path, "commit_message": commit_msg, "branch_name": branch_name},
-                    "response": commit_result,
-                    "summary": f"commit {commit_result.get('commit_hash','?')[:8]} — {file_path}",
-                })
-            except Exception as e:
-                logger.error(f"[RUNNER] commit failed for {file_path}: {e}")
-                run_debug_trace.append({
-                    "stage": "commit_fix",
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                    "duration_ms": 0,
-                    "request": {"file_path": file_path},
-                    "response": {"error": str(e)},
-                    "summary": f"FAILED — {file_path}: {e}",
+                    "request": {"session_id": session_id, "files": [f for f, _ in commits], "branch_name": branch_name},
+                    "response": batch_result,
+                    "summary": f"commit {(batch_result.get('commit_hash') or '?')[:8]} — {len(commits)} fix(es)",
                 })
 
     # ── 5. Timing & score ──
-    time_taken = time.time() - start_time
+    time_taken = time.monotonic() - start_time
     score = _calculate_score(total_commits, time_taken)
-    logger.info(f"[RUNNER] score={score}  time_taken={time_taken:.1f}s  total_commits={total_commits}")
+    logger.info("[RUNNER] score=%s  time_taken=%.1fs  total_commits=%d", score, time_taken, total_commits)
 
     # ── 6. Build result ──
     passed = final_state["passed"]
-    total_fixes = len([f for f in final_state["fixes_applied"] if f["status"] == "fixed"])
     errors_remaining = final_state["errors"]
 
-    logger.info(f"[RUNNER] final: passed={passed}  total_fixes={total_fixes}  errors_remaining={len(errors_remaining)}")
-
-    run_summary = {
-        "repo_url": repo_url,
-        "team_name": team_name,
-        "team_leader_name": team_leader_name,
-        "branch_name": branch_name,
-        "total_failures": final_state.get("total_failures_detected", 0),
-        "total_fixes": total_fixes,
-        "final_status": "PASSED" if passed else "FAILED",
-        "time_taken_seconds": round(time_taken, 2),
-    }
+    logger.info("[RUNNER] final: passed=%s  total_fixes=%d  errors_remaining=%d", passed, total_fixes, len(errors_remaining))
 
     # Merge run-level trace entries (session/commit) with graph-level trace
     full_debug_trace = run_debug_trace[:1] + final_state.get("debug_trace", []) + run_debug_trace[1:]
 
-    result = {
-        "session_id": session_id,
-        "status": "passed" if passed else ("partial_fix" if total_fixes > 0 else "failed"),
-        "passed": passed,
-        "iterations": final_state["iteration"],
-        "message": "All tests passing." if passed else f"{len(errors_remaining)} error(s) remain.",
-        "run_summary": run_summary,
-        "score_breakdown": score,
-        "fixes_applied": final_state["fixes_applied"],
-        "ci_timeline": final_state["ci_timeline"],
-        "commit_hash": commit_hash,
-        "branch_name": branch_name if commit_hash else None,
-        "errors_remaining": errors_remaining,
-        "debug_trace": full_debug_trace,
-    }
+    result = RunResult(
+        session_id=session_id,
+        passed=passed,
+        iterations=final_state["iteration"],
+        repo_url=repo_url,
+        team_name=team_name,
+        team_leader_name=team_leader_name,
+        branch_name=branch_name,
+        total_failures=final_state.get("total_failures_detected", 0),
+        total_fixes=total_fixes,
+        time_taken_seconds=time_taken,
+        score_breakdown=score,
+        fixes_applied=final_state["fixes_applied"],
+        ci_timeline=final_state["ci_timeline"],
+        commit_hash=commit_hash,
+        errors_remaining=errors_remaining,
+        debug_trace=full_debug_trace,
+    ).to_dict()
 
-    # ── 7. Write results.json ──
-    try:
-        results_path = Path("results.json")
-        results_path.write_text(json.dumps(result, indent=2, default=str))
-        logger.info(f"run_agent: results.json written to {results_path.resolve()}")
-    except Exception as e:
-        logger.error(f"run_agent: failed to write results.json: {e}")
+    # ── 7. Write results.json in the background — the caller only needs `result` ──
+    _spawn(_write_results(result))
+
+    # Only passing runs are memoized — failures stay re-runnable (flaky tests, LLM variance)
+    if cache_key is not None and passed:
+        _result_cache[cache_key] = result
 
     return result
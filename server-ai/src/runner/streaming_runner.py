@@ -1,35 +1,224 @@
 """streaming_runner — runs the healing pipeline with real-time WebSocket log streaming."""
 
+import asyncio
 import logging
 import re
+import string
 import time
 from datetime import datetime, timezone
-from typing import Any, Awaitable, Callable
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, NamedTuple
 
-from src.app.config import api_settings
+import orjson
+
+from src.app.config import get_settings
 from src.endpoints.pr import CreatePRRequest, create_pull_request
-from src.llm.llm_client import ask_llm, clean_code_fences
+from src.llm.cache import failure_signature, llm_cache
+from src.llm.llm_client import ask_llm_async, ask_llm_stream, clean_code_fences
 from src.services.ec2_client import EC2Client
 
 logger = logging.getLogger("rift_server")
 
 LogFn = Callable[[dict[str, Any]], Awaitable[None]]
 
+# ── Prompt building blocks ──
+# Static text leads every prompt and per-failure details come last, so
+# consecutive calls share the longest possible prefix (provider prompt caches
+# key on exact prefix matches).
+_FIX_PROMPT_HEAD = (
+    "CI pipeline failed. Fix the issue with a MINIMAL change.\n"
+    "Return ONLY the complete corrected file contents with no explanation, "
+    "no markdown fences, no commentary.\n\n"
+)
+_TEST_HINT = (
+    "NOTE: The file reported in the error is a TEST file. "
+    "The test assertions are CORRECT. The bug is in the IMPLEMENTATION file.\n"
+    "You must fix the IMPLEMENTATION file and return its full corrected contents.\n"
+    "Output EXACTLY one line first: TARGET_FILE: <path/to/impl/file>\n"
+    "then output the complete corrected implementation file contents.\n"
+    "Do NOT modify the test file. Do NOT wrap code in markdown fences.\n\n"
+)
+_LANGUAGE_HINTS: dict[str, str] = {
+    "python": "Preserve existing imports, type hints and indentation style.\n",
+    "nodejs": "Keep the existing module syntax (ESM or CommonJS) and do not add `any` types.\n",
+}
+_EXPLAIN_PROMPT_HEAD = (
+    "You are an expert code reviewer. A CI test failure was fixed by AI. "
+    "Provide a clear, concise explanation in EXACTLY this JSON format (no markdown, no extra text):\n\n"
+    '{"root_cause": "<1-2 sentences: what was wrong in the original code>", '
+    '"changes_made": "<1-2 sentences: what specific changes were made to fix it>", '
+    '"impact": "<1 sentence: what tests now pass because of this fix>"}\n\n'
+)
+
+
+@lru_cache(maxsize=16)
+def _fix_prompt_prefix(language: str, is_test: bool) -> str:
+    """Static head of the fix prompt, built once per (language, test-file) pair."""
+    return (
+        f"{_FIX_PROMPT_HEAD}{_TEST_HINT if is_test else ''}"
+        f"Language: {language}\n{_LANGUAGE_HINTS.get(language, '')}\n"
+    )
+
+
+# Relative parent imports in a test file, e.g. `from "../utils/math"`
+_IMPORT_RE = re.compile(r'from\s+"(\.\./[^"]+)"')
+# Upper bound on import-derived candidates probed concurrently via read_file
+_MAX_IMPL_PROBES = 8
+
+
+_BRANCH_CLEAN_RE = re.compile(r"[^A-Z0-9_]")
+# ASCII fast path: one str.translate pass that uppercases, maps "-"/" " → "_"
+# and deletes everything outside [A-Z0-9_]
+_BRANCH_KEEP = frozenset(string.ascii_uppercase + string.digits + "_")
+_BRANCH_TABLE: dict[int, int | None] = {
+    i: (
+        ord("_") if c in "- "
+        else ord(c.upper()) if c in string.ascii_lowercase
+        else i if c in _BRANCH_KEEP
+        else None
+    )
+    for i, c in ((i, chr(i)) for i in range(128))
+}
+
+
+class _RepoRef(NamedTuple):
+    owner: str
+    name: str
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.owner}/{self.name}"
+
+
+def _parse_repo_url(repo_url: str) -> _RepoRef:
+    """``https://github.com/owner/repo.git`` → ``_RepoRef("owner", "repo")``."""
+    path = repo_url.rstrip("/")
+    if path.endswith(".git"):
+        path = path[:-4]
+    head, _, name = path.rpartition("/")
+    return _RepoRef(head.replace(":", "/").rpartition("/")[2], name)
+
 
 def _branch_name_from(repo_name: str) -> str:
     """Derive branch name from repo name: REPO_NAME_AI_Fix."""
-    clean = re.sub(r"[^A-Z0-9_]", "", repo_name.upper().replace("-", "_").replace(" ", "_"))
+    if repo_name.isascii():
+        clean = repo_name.translate(_BRANCH_TABLE)
+    else:
+        # Non-ASCII can uppercase into ASCII (e.g. "ß" → "SS"), so keep the full path
+        clean = _BRANCH_CLEAN_RE.sub("", repo_name.upper().replace("-", "_").replace(" ", "_"))
     return f"{clean}_AI_Fix"
 
 
-def _ts() -> str:
-    return datetime.now(timezone.utc).strftime("%H:%M:%S")
+class TsCache:
+    """``HH:MM:SS`` (UTC) for log lines, formatted at most once per wall-clock second."""
+
+    __slots__ = ("_sec", "_str")
+
+    def __init__(self) -> None:
+        self._sec = -1
+        self._str = ""
+
+    def __call__(self) -> str:
+        now = time.time()
+        sec = int(now)
+        if sec != self._sec:
+            self._sec = sec
+            self._str = time.strftime("%H:%M:%S", time.gmtime(sec))
+        return self._str
+
+
+_ts = TsCache()
+
+
+# Context files at least this large are windowed around the failing line
+_WINDOW_MIN_CHARS = 4000
+
+
+def _windowed_source(content: str, line: int | None, radius: int = 80) -> str:
+    """Lines ``line ± radius`` of *content*, with markers for what was left out."""
+    if not isinstance(line, int) or line < 1:
+        return content
+    lines = content.split("\n")
+    lo = max(0, line - 1 - radius)
+    hi = min(len(lines), line + radius)
+    if lo == 0 and hi == len(lines):
+        return content
+    out: list[str] = []
+    if lo:
+        out.append(f"... <{lo} lines omitted> ...")
+    out.extend(lines[lo:hi])
+    if hi < len(lines):
+        out.append(f"... <{len(lines) - hi} lines omitted> ...")
+    return "\n".join(out)
 
 
 async def _noop(_event: dict[str, Any]) -> None:
     pass
 
 
+# Debounce window for coalescing events into one WebSocket frame
+_FLUSH_DELAY = 0.01
+
+
+class BatchedEmitter:
+    """
+    Coalesces pipeline events into as few WebSocket frames as possible.
+
+    ``enqueue`` is a non-blocking ``put_nowait``.  A single background flusher
+    takes the first queued event, waits ``_FLUSH_DELAY`` for followers, then
+    drains the queue into one ``{"type": "batch", "events": [...]}`` frame.
+    A lone event is sent as-is.  The flusher is the only sender, so order is kept.
+    """
+
+    __slots__ = ("_send", "_delay", "_queue", "_flusher")
+
+    def __init__(self, send: LogFn, delay: float = _FLUSH_DELAY) -> None:
+        self._send = send
+        self._delay = delay
+        self._queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self._flusher: asyncio.Task | None = None
+
+    def enqueue(self, event: dict[str, Any]) -> None:
+        self._queue.put_nowait(event)
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    def log(self, line: str) -> None:
+        """Queue a timestamped ``log`` event."""
+        self.enqueue({"type": "log", "line": line, "ts": _ts()})
+
+    def step(self, step: str, status: str) -> None:
+        """Queue a ``step`` status change."""
+        self.enqueue({"type": "step", "step": step, "status": status})
+
+    async def _flush_loop(self) -> None:
+        queue = self._queue
+        while True:
+            events = [await queue.get()]
+            await asyncio.sleep(self._delay)
+            while not queue.empty():
+                events.append(queue.get_nowait())
+            try:
+                await self._send(events[0] if len(events) == 1 else {"type": "batch", "events": events})
+            except Exception as exc:
+                logger.warning("[Runner] dropped %d stream event(s): %s", len(events), exc)
+            finally:
+                for _ in events:
+                    queue.task_done()
+
+    async def flush(self) -> None:
+        """Wait until everything queued so far has been sent."""
+        await self._queue.join()
+
+    async def aclose(self) -> None:
+        """Send whatever is queued, then stop the flusher."""
+        if self._flusher is None:
+            return
+        await self._queue.join()
+        self._flusher.cancel()
+        self._flusher = None
+
+
 async def run_streaming(
     *,
     repo_url: str,
@@ -47,35 +236,77 @@ async def run_streaming(
     Full healing pipeline with real-time log streaming.
 
     ``log`` is an async callback that receives event dicts to forward to the
-    WebSocket client.  If *None*, logging is silently skipped.
+    WebSocket client.  If *None*, logging is silently skipped.  Events are
+    batched (see ``BatchedEmitter``); everything is flushed before returning.
     """
-    emit = log or _noop
-    start = time.time()
+    emitter = BatchedEmitter(log or _noop)
+    try:
+        return await _run_pipeline(
+            emitter,
+            repo_url=repo_url,
+            language=language,
+            install_command=install_command,
+            test_command=test_command,
+            branch=branch,
+            branch_name=branch_name,
+            max_iterations=max_iterations,
+            session_id=session_id,
+            github_token=github_token,
+        )
+    finally:
+        await emitter.aclose()
+
+
+async def _run_pipeline(
+    emitter: BatchedEmitter,
+    *,
+    repo_url: str,
+    language: str,
+    install_command: str | None,
+    test_command: str | None,
+    branch: str,
+    branch_name: str | None,
+    max_iterations: int | None,
+    session_id: str | None,
+    github_token: str | None,
+) -> dict[str, Any]:
+    emit = emitter.enqueue
+    log = emitter.log
+    step = emitter.step
+    flush = emitter.flush
+    start = time.monotonic()
     client = EC2Client()
-    max_iters = max_iterations or api_settings.max_iterations
+    max_iters = max_iterations or get_settings().max_iterations
+    repo = _parse_repo_url(repo_url)
 
     if not branch_name:
-        repo_name = repo_url.rstrip("/").split("/")[-1].replace(".git", "")
-        branch_name = _branch_name_from(repo_name)
+        branch_name = _branch_name_from(repo.name)
 
     fixes_applied: list[dict[str, Any]] = []
+    fixed_entries: list[dict[str, Any]] = []  # the subset of fixes_applied with status "fixed"
     ci_timeline: list[dict[str, Any]] = []
     fixed_files: list[str] = []
+    seen_signatures: set[str] = set()
+    # Parsed explanations by (bug_type, file, error head, code before, code after) —
+    # only a byte-identical edit of the same failure reuses one
+    explain_cache: dict[tuple[str, str, str, str, str], dict[str, str]] = {}
 
     # ── 1. Clone (skip if session_id already provided) ────────────────────
     if session_id:
         # Client already cloned — skip cloning step
-        await emit({"type": "step", "step": "cloning", "status": "done"})
-        await emit({"type": "log", "line": f"  ✓ Using existing session {session_id[:8]}…", "ts": _ts()})
+        step("cloning", "done")
+        await flush()
+        log(f"  ✓ Using existing session {session_id[:8]}…")
     else:
-        await emit({"type": "step", "step": "cloning", "status": "running"})
-        await emit({"type": "log", "line": f"$ git clone {repo_url}", "ts": _ts()})
+        step("cloning", "running")
+        log(f"$ git clone {repo_url}")
 
         try:
             session = await client.create_session(repo_url, language)
             session_id = session["session_id"]
-            await emit({"type": "log", "line": f"  Cloned into session {session_id[:8]}…", "ts": _ts()})
-            await emit({"type": "step", "step": "cloning", "status": "done"})
+            log(f"  Cloned into session {session_id[:8]}…")
+            step("cloning", "done")
+            await flush()
         except Exception as e:
             # Unwrap the EC2 agent error wrapper so users see only the clean message
             # e.g. "EC2 agent [create_session] 500: 🔒 Repository is private…"
@@ -84,45 +315,44 @@ async def run_streaming(
             clean_msg = raw
             if "]: " in raw:
                 clean_msg = raw.split("]: ", 1)[-1].strip()
-            await emit({"type": "log", "line": f"  ERROR: {clean_msg}", "ts": _ts()})
-            await emit({"type": "step", "step": "cloning", "status": "error"})
-            await emit({"type": "error", "message": clean_msg, "step": "cloning"})
+            log(f"  ERROR: {clean_msg}")
+            step("cloning", "error")
+            await flush()
+            emit({"type": "error", "message": clean_msg, "step": "cloning"})
             return _build_result(
                 session_id="", passed=False, iteration=0,
                 fixes_applied=[], ci_timeline=[], errors_remaining=[],
                 branch_name=branch_name, commit_hash=None,
-                time_taken=time.time() - start, repo_url=repo_url,
+                time_taken=time.monotonic() - start, repo_url=repo_url,
             )
 
     # ── 2. Healing loop ──────────────────────────────────────────────────
     iteration = 0
     passed = False
     errors: list[dict] = []
-    raw_output = ""
+    output_block = "(no output)"
     total_failures = 0
 
+    # Real-time streaming callback — forwards each Docker output line to WebSocket
+    async def _on_stream_line(phase: str, line: str) -> None:
+        prefix = "  " if phase == "test" else "  [install] "
+        log(f"{prefix}{line}")
+
     while iteration < max_iters:
         iteration += 1
         is_first = iteration == 1
         step_name = "running_tests" if is_first else "verifying"
 
-        await emit({"type": "step", "step": step_name, "status": "running"})
-        await emit({"type": "log", "line": "", "ts": _ts()})
-        await emit({
-            "type": "log",
-            "line": f"{'▶ Running test suite' if is_first else '▶ Re-running tests'} (iteration {iteration}/{max_iters})",
-            "ts": _ts(),
-        })
+        step(step_name, "running")
+        log("")
+        log(
+            f"{'▶ Running test suite' if is_first else '▶ Re-running tests'} (iteration {iteration}/{max_iters})"
+        )
 
         if install_command:
-            await emit({"type": "log", "line": f"  $ {install_command}", "ts": _ts()})
+            log(f"  $ {install_command}")
         if test_command:
-            await emit({"type": "log", "line": f"  $ {test_command}", "ts": _ts()})
-
-        # Real-time streaming callback — forwards each Docker output line to WebSocket
-        async def _on_stream_line(phase: str, line: str) -> None:
-            prefix = "  " if phase == "test" else "  [install] "
-            await emit({"type": "log", "line": f"{prefix}{line}", "ts": _ts()})
+            log(f"  $ {test_command}")
 
         try:
             result = await client.execute_tests_streaming(
@@ -133,41 +363,41 @@ async def run_streaming(
                 on_line=_on_stream_line,
             )
         except Exception as e:
-            await emit({"type": "log", "line": f"  ERROR: {e}", "ts": _ts()})
-            await emit({"type": "step", "step": step_name, "status": "error"})
-            await emit({"type": "error", "message": f"Test execution failed: {e}"})
+            log(f"  ERROR: {e}")
+            step(step_name, "error")
+            await flush()
+            emit({"type": "error", "message": f"Test execution failed: {e}"})
             break
 
         errors = result.get("errors", [])
         passed = result.get("status") == "success"
         raw_output = result.get("raw_output", "")
+        # Only the head of the log goes into the prompt
+        output_block = (
+            f"```\n{raw_output[:3000]}{'…<truncated>' if len(raw_output) > 3000 else ''}\n```"
+            if raw_output
+            else "(no output)"
+        )
 
         # ── Detect "no tests collected" early and abort with a clear error ──
         # Covers pytest ("collected 0 items", "no tests ran") and
         # jest/vitest ("0 tests", "no test files found")
         if is_first:
+            lowered = raw_output.lower()
             no_tests = (
                 "collected 0 items" in raw_output
-                or "no tests ran" in raw_output.lower()
-                or "no test files found" in raw_output.lower()
-                or ("error" in raw_output.lower() and "file or directory not found" in raw_output.lower())
-                or (raw_output.strip().endswith("0 passed") and "no tests" in raw_output.lower())
+                or "no tests ran" in lowered
+                or "no test files found" in lowered
+                or ("error" in lowered and "file or directory not found" in lowered)
+                or (raw_output.rstrip().endswith("0 passed") and "no tests" in lowered)
             )
             if no_tests:
-                await emit({"type": "log", "line": "", "ts": _ts()})
-                await emit({
-                    "type": "log",
-                    "line": "  ✗ No test files found in this repository.",
-                    "ts": _ts(),
-                })
-                await emit({
-                    "type": "log",
-                    "line": "  Please make sure your test command points to the correct directory",
-                    "ts": _ts(),
-                })
-                await emit({"type": "log", "line": "  and that test files follow the expected naming convention", "ts": _ts()})
-                await emit({"type": "log", "line": "  (e.g. test_*.py for pytest, *.test.ts for jest/vitest).", "ts": _ts()})
-                await emit({
+                log("")
+                log("  ✗ No test files found in this repository.")
+                log("  Please make sure your test command points to the correct directory")
+                log("  and that test files follow the expected naming convention")
+                log("  (e.g. test_*.py for pytest, *.test.ts for jest/vitest).")
+                emit({
                     "type": "error",
                     "message": (
                         "No test files found. Please check your test command and make sure test files "
@@ -178,7 +408,7 @@ async def run_streaming(
                     session_id=session_id, passed=False, iteration=iteration,
                     fixes_applied=[], ci_timeline=ci_timeline, errors_remaining=[],
                     branch_name=None, commit_hash=None,
-                    time_taken=time.time() - start, repo_url=repo_url,
+                    time_taken=time.monotonic() - start, repo_url=repo_url,
                 )
 
         if is_first:
@@ -193,7 +423,7 @@ async def run_streaming(
             "timestamp": ts_iso,
         })
 
-        await emit({
+        emit({
             "type": "iteration",
             "iteration": iteration,
             "total": max_iters,
@@ -202,21 +432,23 @@ async def run_streaming(
         })
 
         if passed:
-            await emit({"type": "log", "line": "", "ts": _ts()})
-            await emit({"type": "log", "line": "  ✓ All tests passing!", "ts": _ts()})
-            await emit({"type": "step", "step": step_name, "status": "done"})
+            log("")
+            log("  ✓ All tests passing!")
+            step(step_name, "done")
+            await flush()
             break
 
-        await emit({"type": "log", "line": f"  ✗ {len(errors)} error(s) found", "ts": _ts()})
-        await emit({"type": "step", "step": step_name, "status": "done"})
+        log(f"  ✗ {len(errors)} error(s) found")
+        step(step_name, "done")
+        await flush()
 
         if not errors:
             break
 
         # ── Analyse ───────────────────────────────────────────────────────
-        await emit({"type": "step", "step": "analyzing", "status": "running"})
-        await emit({"type": "log", "line": "", "ts": _ts()})
-        await emit({"type": "log", "line": "▶ Analyzing failures…", "ts": _ts()})
+        step("analyzing", "running")
+        log("")
+        log("▶ Analyzing failures…")
 
         current_error = errors[0]
         file_path = current_error.get("file", "unknown")
@@ -225,19 +457,20 @@ async def run_streaming(
         error_message = current_error.get("message", "")
 
         loc = f" at line {line_number}" if line_number else ""
-        await emit({"type": "log", "line": f"  Error: {bug_type} in {file_path}{loc}", "ts": _ts()})
+        log(f"  Error: {bug_type} in {file_path}{loc}")
         if error_message:
-            await emit({"type": "log", "line": f"  {error_message.split(chr(10))[0][:200]}", "ts": _ts()})
+            log(f"  {error_message.split(chr(10))[0][:200]}")
 
-        await emit({"type": "step", "step": "analyzing", "status": "done"})
+        step("analyzing", "done")
+        await flush()
 
         # ── Fix ───────────────────────────────────────────────────────────
-        await emit({"type": "step", "step": "fixing", "status": "running"})
-        await emit({"type": "log", "line": "", "ts": _ts()})
-        await emit({"type": "log", "line": "▶ Generating AI fix…", "ts": _ts()})
+        step("fixing", "running")
+        log("")
+        log("▶ Generating AI fix…")
 
         current_content = await client.read_file(session_id, file_path)
-        await emit({"type": "log", "line": f"  Reading {file_path} ({len(current_content)} chars)", "ts": _ts()})
+        log(f"  Reading {file_path} ({len(current_content)} chars)")
 
         is_test = any(x in file_path.lower() for x in ("test", "spec", "__test__"))
         ext = file_path.rsplit(".", 1)[-1] if "." in file_path else ""
@@ -247,20 +480,16 @@ async def run_streaming(
         impl_content = ""
         impl_path = ""
         if is_test:
-            await emit({"type": "log", "line": "  Test file detected — locating implementation…", "ts": _ts()})
+            log("  Test file detected — locating implementation…")
             possible: list[str] = []
             if current_content:
                 if "../index" in current_content:
                     possible.extend(["src/index.ts", "src/index.js"])
-                try:
-                    for cline in current_content.split("\n"):
-                        if 'from "' in cline and "../" in cline:
-                            imp = cline.split('from "')[1].split('"')[0]
-                            if imp.startswith("../"):
-                                rel = imp.replace("../", "src/")
-                                possible.extend([rel + ".ts", rel + ".js"])
-                except (IndexError, ValueError):
-                    pass
+                for m in _IMPORT_RE.finditer(current_content):
+                    rel = m.group(1).replace("../", "src/")
+                    possible.extend((rel + ".ts", rel + ".js"))
+                    if len(possible) >= _MAX_IMPL_PROBES:
+                        break
             guess = (
                 file_path
                 .replace("/tests/", "/")
@@ -269,58 +498,64 @@ async def run_streaming(
             )
             if guess != file_path:
                 possible.append(guess)
-            for p in possible:
-                content = await client.read_file(session_id, p)
-                if content:
+            # Probe every candidate concurrently; keep the first hit in priority order
+            possible = list(dict.fromkeys(possible))
+            contents = await asyncio.gather(
+                *(client.read_file(session_id, p) for p in possible),
+                return_exceptions=True,
+            )
+            for p, content in zip(possible, contents):
+                if content and isinstance(content, str):
                     impl_content, impl_path = content, p
-                    await emit({"type": "log", "line": f"  Found implementation: {p}", "ts": _ts()})
+                    log(f"  Found implementation: {p}")
                     break
 
         impl_block = ""
         if impl_content and impl_path:
+            # The test file is only context now (the fix targets the implementation),
+            # so a window around the failing line is enough for large files
+            if len(current_content) >= _WINDOW_MIN_CHARS:
+                file_block = f"```{ext}\n{_windowed_source(current_content, line_number)}\n```"
             iext = impl_path.rsplit(".", 1)[-1] if "." in impl_path else ""
             impl_block = (
                 f"\n\n=== IMPLEMENTATION FILE ({impl_path}) ===\n"
                 f"```{iext}\n{impl_content}\n```"
             )
 
-        output_block = (
-            f"```\n{raw_output[:3000]}{'…<truncated>' if len(raw_output) > 3000 else ''}\n```"
-            if raw_output
-            else "(no output)"
-        )
-
-        test_hint = (
-            "\nNOTE: The file reported in the error is a TEST file. "
-            "The test assertions are CORRECT. The bug is in the IMPLEMENTATION file.\n"
-            "You must fix the IMPLEMENTATION file and return its full corrected contents.\n"
-            "Output EXACTLY one line first: TARGET_FILE: <path/to/impl/file>\n"
-            "then output the complete corrected implementation file contents.\n"
-            "Do NOT modify the test file. Do NOT wrap code in markdown fences."
-            if is_test
-            else ""
-        )
-
+        # Stable → volatile, so the provider's prefix cache can reuse the head
         prompt = (
-            "CI pipeline failed. Fix the issue with a MINIMAL change.\n\n"
-            f"=== ERROR INFO ===\nFile: {file_path}\nLanguage: {language}\n"
+            f"{_fix_prompt_prefix(language, is_test)}"
+            f"=== TEST FILE CONTENTS ({file_path}) ===\n{file_block}{impl_block}\n\n"
+            f"=== FULL TEST OUTPUT ===\n{output_block}\n\n"
+            f"=== ERROR INFO ===\nFile: {file_path}\n"
             f"Error Type: {bug_type}\nLine: {line_number or 'unknown'}\n"
             f"Message: {error_message}\n"
             f"Full Trace: {current_error.get('full_trace') or 'None'}\n"
-            f"{test_hint}\n"
-            f"=== TEST FILE CONTENTS ({file_path}) ===\n{file_block}{impl_block}\n\n"
-            f"=== FULL TEST OUTPUT ===\n{output_block}\n\n"
-            "Return ONLY the complete corrected file contents with no explanation, "
-            "no markdown fences, no commentary."
         )
 
-        await emit({"type": "log", "line": "  Calling AI model…", "ts": _ts()})
+        signature = failure_signature(bug_type, file_path, error_message, current_content, impl_content)
+        # A signature seen earlier in this run means that fix didn't work — ask the model afresh
+        cached_fix = None if signature in seen_signatures else llm_cache.get(prompt, signature)
+        seen_signatures.add(signature)
+        if cached_fix is None:
+            log("  Calling AI model…")
+        else:
+            log("  ✓ cache hit")
         t_llm = time.monotonic()
 
         try:
-            raw_fixed = ask_llm(prompt)
+            if cached_fix is not None:
+                raw_fixed = cached_fix
+            else:
+                # Stream the completion to the client as it's generated
+                log("  ▸ ")
+                parts: list[str] = []
+                async for delta in ask_llm_stream(prompt):
+                    parts.append(delta)
+                    emit({"type": "llm_token", "delta": delta})
+                raw_fixed = clean_code_fences("".join(parts))
         except Exception as e:
-            await emit({"type": "log", "line": f"  ERROR: LLM failed — {e}", "ts": _ts()})
+            log(f"  ERROR: LLM failed — {e}")
             fixes_applied.append({
                 "file": file_path, "bug_type": bug_type,
                 "line_number": line_number, "commit_message": "",
@@ -328,15 +563,12 @@ async def run_streaming(
                 "error_message": error_message,
                 "description": f"AI could not generate a fix: {e}",
             })
-            await emit({"type": "step", "step": "fixing", "status": "error"})
+            step("fixing", "error")
+            await flush()
             break
 
         llm_ms = (time.monotonic() - t_llm) * 1000
-        await emit({
-            "type": "log",
-            "line": f"  AI response received ({len(raw_fixed)} chars, {llm_ms:.0f}ms)",
-            "ts": _ts(),
-        })
+        log(f"  AI response received ({len(raw_fixed)} chars, {llm_ms:.0f}ms)")
 
         # Handle TARGET_FILE redirect for test-file errors
         fixed_code = raw_fixed
@@ -350,9 +582,27 @@ async def run_streaming(
                     actual_file = suggested
                     fixed_code = lines[1] if len(lines) > 1 else ""
                     fixed_code = clean_code_fences(fixed_code)
-                    await emit({"type": "log", "line": f"  Redirected fix → {actual_file}", "ts": _ts()})
+                    log(f"  Redirected fix → {actual_file}")
+
+        # The explanation only needs the fix itself — generate it while apply_fix runs
+        explain_key = (bug_type, actual_file, error_message[:100], current_content, fixed_code)
+        cached_explain = explain_cache.get(explain_key)
+        explain_task: asyncio.Task | None = None
+        if cached_explain is None:
+            explain_prompt = (
+                f"{_EXPLAIN_PROMPT_HEAD}"
+                f"File fixed: {actual_file}\n\n"
+                f"Original code (first 1500 chars):\n{current_content[:1500]}\n\n"
+                f"Fixed code (first 1500 chars):\n{fixed_code[:1500]}\n\n"
+                f"Error type: {bug_type}\n"
+                f"Error message: {error_message[:300]}\n"
+                f"Line: {line_number or 'unknown'}"
+            )
+            explain_task = asyncio.create_task(ask_llm_async(explain_prompt))
+            # Mark the outcome as retrieved, so a discarded failure isn't logged as unhandled
+            explain_task.add_done_callback(lambda t: t.cancelled() or t.exception())
 
-        await emit({"type": "log", "line": f"  Applying fix to {actual_file}…", "ts": _ts()})
+        log(f"  Applying fix to {actual_file}…")
 
         try:
             fix_result = await client.apply_fix(
@@ -365,7 +615,11 @@ async def run_streaming(
             fix_ok = fix_result.get("success", False)
         except Exception as e:
             fix_ok = False
-            await emit({"type": "log", "line": f"  ERROR: apply failed — {e}", "ts": _ts()})
+            log(f"  ERROR: apply failed — {e}")
+
+        # Only remember completions that produced an applicable fix
+        if fix_ok and cached_fix is None:
+            llm_cache.put(prompt, raw_fixed, signature)
 
         # ── Generate structured explanation ──────────────────────────────
         explanation = {
@@ -374,34 +628,23 @@ async def run_streaming(
             "impact": "",
         }
 
-        if fix_ok:
-            await emit({"type": "log", "line": "  Generating fix explanation…", "ts": _ts()})
+        if not fix_ok:
+            if explain_task is not None:
+                explain_task.cancel()
+        elif cached_explain is not None:
+            explanation = dict(cached_explain)
+            log("  ✓ explanation cache hit")
+        else:
+            log("  Generating fix explanation…")
             try:
-                explain_prompt = (
-                    "You are an expert code reviewer. A CI test failure was fixed by AI. "
-                    "Provide a clear, concise explanation in EXACTLY this JSON format (no markdown, no extra text):\n\n"
-                    '{"root_cause": "<1-2 sentences: what was wrong in the original code>", '
-                    '"changes_made": "<1-2 sentences: what specific changes were made to fix it>", '
-                    '"impact": "<1 sentence: what tests now pass because of this fix>"}\n\n'
-                    f"Error type: {bug_type}\n"
-                    f"Error message: {error_message[:300]}\n"
-                    f"File fixed: {actual_file}\n"
-                    f"Line: {line_number or 'unknown'}\n\n"
-                    f"Original code (first 1500 chars):\n{current_content[:1500]}\n\n"
-                    f"Fixed code (first 1500 chars):\n{fixed_code[:1500]}"
-                )
-                raw_explain = ask_llm(explain_prompt)
-                # Try to parse JSON from the response
-                import json as _json
-                # Strip any markdown fences
-                cleaned = raw_explain.strip()
-                if cleaned.startswith("```"):
-                    cleaned = cleaned.split("\n", 1)[-1].rsplit("```", 1)[0].strip()
-                parsed = _json.loads(cleaned)
+                raw_explain = await explain_task
+                # Try to parse JSON from the response, minus any markdown fences
+                parsed = orjson.loads(clean_code_fences(raw_explain))
                 explanation["root_cause"] = parsed.get("root_cause", "")[:300]
                 explanation["changes_made"] = parsed.get("changes_made", "")[:300]
                 explanation["impact"] = parsed.get("impact", "")[:200]
-                await emit({"type": "log", "line": "  ✓ Explanation generated", "ts": _ts()})
+                explain_cache[explain_key] = dict(explanation)
+                log("  ✓ Explanation generated")
             except Exception as e:
                 logger.warning(f"[Runner] Explanation generation failed: {e}")
                 # Fall back to generic description
@@ -430,35 +673,32 @@ async def run_streaming(
             "explanation": explanation,
         }
         fixes_applied.append(fix_entry)
+        if fix_ok:
+            fixed_entries.append(fix_entry)
 
         if actual_file not in fixed_files:
             fixed_files.append(actual_file)
 
-        await emit({"type": "fix", "fix": fix_entry})
+        emit({"type": "fix", "fix": fix_entry})
 
         status_word = "✓ Fix applied" if fix_ok else "✗ Fix failed"
-        await emit({"type": "log", "line": f"  {status_word}", "ts": _ts()})
-        await emit({"type": "step", "step": "fixing", "status": "done"})
+        log(f"  {status_word}")
+        step("fixing", "done")
+        await flush()
 
     # ── 3. Commit ─────────────────────────────────────────────────────────
     commit_hash: str | None = None
     total_commits = 0
 
     if fixed_files:
-        await emit({"type": "step", "step": "committing", "status": "running"})
-        await emit({"type": "log", "line": "", "ts": _ts()})
-        await emit({
-            "type": "log",
-            "line": f"▶ Committing {len(fixed_files)} file(s) to {branch_name}…",
-            "ts": _ts(),
-        })
+        step("committing", "running")
+        log("")
+        log(f"▶ Committing {len(fixed_files)} file(s) to {branch_name}…")
 
-        for fix in fixes_applied:
-            if fix.get("status") != "fixed":
-                continue
+        for fix in fixed_entries:
             fp = fix["file"]
             cm = fix.get("commit_message", f"[AI-AGENT] Fix {fp}")
-            await emit({"type": "log", "line": f"  $ git commit -m \"{cm}\"", "ts": _ts()})
+            log(f"  $ git commit -m \"{cm}\"")
             try:
                 commit_result = await client.commit_fix(
                     session_id=session_id,
@@ -471,57 +711,54 @@ async def run_streaming(
                     commit_hash = commit_result.get("commit_hash")
                     total_commits += 1
                     short = commit_hash[:8] if commit_hash else "ok"
-                    await emit({"type": "log", "line": f"  ✓ committed ({short})", "ts": _ts()})
+                    log(f"  ✓ committed ({short})")
                 else:
-                    await emit({"type": "log", "line": "  ✗ commit failed", "ts": _ts()})
+                    log("  ✗ commit failed")
             except Exception as e:
-                await emit({"type": "log", "line": f"  ✗ commit error: {e}", "ts": _ts()})
+                log(f"  ✗ commit error: {e}")
 
-        await emit({"type": "step", "step": "committing", "status": "done"})
+        step("committing", "done")
+        await flush()
 
     # ── 4. Create PR ──────────────────────────────────────────────────────
     pr_created_url = None
     if total_commits > 0 and github_token:
-        await emit({"type": "step", "step": "pr_creation", "status": "running"})
-        await emit({"type": "log", "line": "", "ts": _ts()})
-        await emit({"type": "log", "line": "▶ Creating Pull Request...", "ts": _ts()})
+        step("pr_creation", "running")
+        log("")
+        log("▶ Creating Pull Request...")
 
         try:
-            # Parse repo owner/name from URL
-            # e.g., https://github.com/owner/repo.git -> owner/repo
-            clean_url = repo_url.rstrip("/")
-            if clean_url.endswith(".git"):
-                clean_url = clean_url[:-4]
-            repo_full_name = "/".join(clean_url.split("/")[-2:])
+            repo_full_name = repo.full_name
 
             # Build PR body from explanations
-            pr_body = "## 🤖 AI Fix Summary\n\n"
-            pr_body += "The following issues were identified and fixed by the AI agent:\n\n"
+            body_parts: list[str] = [
+                "## 🤖 AI Fix Summary\n\n",
+                "The following issues were identified and fixed by the AI agent:\n\n",
+            ]
             
             first_commit_msg = "Automated Fixes"
             
-            for i, fix in enumerate(fixes_applied):
-                if fix.get("status") != "fixed": continue
-                
+            for i, fix in enumerate(fixed_entries):
                 if i == 0:
                     first_commit_msg = fix.get("commit_message", "").split(":", 1)[-1].strip()
                 
                 explanation = fix.get("explanation", {})
                 file_path = fix.get("file", "unknown file")
                 
-                pr_body += f"### {i+1}. Fix in `{file_path}`\n"
+                body_parts.append(f"### {i+1}. Fix in `{file_path}`\n")
                 if explanation:
                     if explanation.get("root_cause"):
-                        pr_body += f"- **Root Cause:** {explanation['root_cause']}\n"
+                        body_parts.append(f"- **Root Cause:** {explanation['root_cause']}\n")
                     if explanation.get("changes_made"):
-                        pr_body += f"- **Changes Made:** {explanation['changes_made']}\n"
+                        body_parts.append(f"- **Changes Made:** {explanation['changes_made']}\n")
                     if explanation.get("impact"):
-                        pr_body += f"- **Impact:** {explanation['impact']}\n"
+                        body_parts.append(f"- **Impact:** {explanation['impact']}\n")
                 else:
-                    pr_body += f"- {fix.get('description', 'No description available.')}\n"
-                pr_body += "\n"
+                    body_parts.append(f"- {fix.get('description', 'No description available.')}\n")
+                body_parts.append("\n")
 
-            pr_body += "---\n*Generated by GreenBranch AI*"
+            body_parts.append("---\n*Generated by GreenBranch AI*")
+            pr_body = "".join(body_parts)
 
             # Create PR
             pr_req = CreatePRRequest(
@@ -537,31 +774,30 @@ async def run_streaming(
             
             if pr_resp.success:
                 pr_created_url = pr_resp.pr_url
-                await emit({"type": "log", "line": f"  ✓ PR Created: {pr_created_url}", "ts": _ts()})
-                await emit({"type": "pr_created", "pr_url": pr_created_url, "repo_name": repo_full_name})
-                await emit({"type": "step", "step": "pr_creation", "status": "done"})
+                log(f"  ✓ PR Created: {pr_created_url}")
+                emit({"type": "pr_created", "pr_url": pr_created_url, "repo_name": repo_full_name})
+                step("pr_creation", "done")
+                await flush()
             else:
-                await emit({"type": "log", "line": f"  ✗ PR Failed: {pr_resp.message}", "ts": _ts()})
-                await emit({"type": "step", "step": "pr_creation", "status": "error"})
+                log(f"  ✗ PR Failed: {pr_resp.message}")
+                step("pr_creation", "error")
+                await flush()
 
         except Exception as e:
             logger.error(f"PR creation error: {e}")
-            await emit({"type": "log", "line": f"  ✗ PR Error: {e}", "ts": _ts()})
-            await emit({"type": "step", "step": "pr_creation", "status": "error"})
+            log(f"  ✗ PR Error: {e}")
+            step("pr_creation", "error")
+            await flush()
 
     # ── 4. Summary ────────────────────────────────────────────────────────
-    time_taken = time.time() - start
-    total_fixed = len([f for f in fixes_applied if f["status"] == "fixed"])
-
-    await emit({"type": "log", "line": "", "ts": _ts()})
-    await emit({
-        "type": "log",
-        "line": (
-            f"{'✓' if passed else '✗'} Pipeline complete in {time_taken:.1f}s — "
-            f"{total_fixed} fix(es), {total_commits} commit(s)"
-        ),
-        "ts": _ts(),
-    })
+    time_taken = time.monotonic() - start
+    total_fixed = len(fixed_entries)
+
+    log("")
+    log(
+        f"{'✓' if passed else '✗'} Pipeline complete in {time_taken:.1f}s — "
+        f"{total_fixed} fix(es), {total_commits} commit(s)"
+    )
 
     return _build_result(
         session_id=session_id,
@@ -1,3 +1,3 @@
-from src.services.ec2_client import EC2Client
+from src.services.ec2_client import EC2Client, get_http_client, close_http_client
 
-__all__ = ["EC2Client"]
+__all__ = ["EC2Client", "get_http_client", "close_http_client"]
@@ -1,36 +1,211 @@
 """HTTP client for talking to the EC2 agent service."""
 
-import json
+import asyncio
 import logging
-import time
-from typing import Awaitable, Callable
+from types import MappingProxyType
+from typing import AsyncIterator, Awaitable, Callable
 
 import httpx
+import orjson
 
-from src.app.config import api_settings
+from src.app.config import get_settings
 from src.core.exceptions import EC2AgentError, EC2AgentUnreachable
 
 logger = logging.getLogger("rift_server")
 
 
+_http_client: httpx.AsyncClient | None = None
+
+# Settings are fixed for the process lifetime — build these once
+_settings = get_settings()
+_BASE_URL = _settings.ec2_agent_url.rstrip("/")
+_HEADERS = MappingProxyType(
+    {"X-API-Key": _settings.ec2_agent_api_key} if _settings.ec2_agent_api_key else {}
+)
+
+# Client-side back-pressure shared by every EC2Client in this worker. Test runs
+# (execute/apply_fix) hold their request for minutes, so they get their own cap
+# and can't starve the short calls. Created with the pool, on the running loop.
+_ec2_sem: asyncio.Semaphore | None = None
+_test_run_sem: asyncio.Semaphore | None = None
+_MIN_INTERVAL = 1.0 / _settings.ec2_max_rps if _settings.ec2_max_rps > 0 else 0.0
+_next_slot = 0.0
+_RETRY_BASE = 0.5
+_RETRY_MAX_WAIT = 8.0
+
+# Whether the agent accepts multipart /fix/upload; None until the first apply_fix finds out
+_fix_upload_supported: bool | None = None
+# Likewise for the plain-text /files/raw endpoint
+_raw_files_supported: bool | None = None
+
+# SSE framing: `data: <json>` lines; the agent serialises `type` first in every event
+_SSE_PREFIX = b"data: "
+_SSE_PREFIX_LEN = len(_SSE_PREFIX)
+_SSE_TYPE_PREFIXES = (b'{"type": "', b'{"type":"')
+
+# Log lines buffered between the SSE reader and the on_line consumer
+_LINE_QUEUE_SIZE = 1024
+_LINE_BATCH = 64
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Process-wide pooled AsyncClient shared by every EC2Client.
+
+    Keeps TCP/TLS connections alive between calls and multiplexes concurrent
+    requests over HTTP/2. HTTP/2 is negotiated via TLS ALPN, so it only applies
+    to an https:// agent URL; a plain http:// agent is spoken to over pooled
+    HTTP/1.1 keep-alive connections. Created in the app lifespan; lazily
+    created here otherwise.
+    """
+    global _http_client
+    _init_limits()
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            base_url=_BASE_URL,
+            headers=dict(_HEADERS),
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=64, keepalive_expiry=60.0),
+            # Long read timeout — Docker test runs can take time; fail fast on connect
+            timeout=httpx.Timeout(300.0, connect=3.0),
+        )
+    return _http_client
+
+
+def _init_limits() -> None:
+    """Create the worker-wide semaphores (on the running loop, with the pool)."""
+    global _ec2_sem, _test_run_sem
+    if _ec2_sem is None:
+        settings = get_settings()
+        _ec2_sem = asyncio.Semaphore(max(1, settings.ec2_max_concurrency))
+        _test_run_sem = asyncio.Semaphore(max(1, settings.ec2_max_test_runs))
+
+
+async def _pace() -> None:
+    """Space request starts at least ``_MIN_INTERVAL`` apart (no-op when unlimited)."""
+    global _next_slot
+    if not _MIN_INTERVAL:
+        return
+    now = asyncio.get_running_loop().time()
+    slot = max(now, _next_slot)
+    _next_slot = slot + _MIN_INTERVAL
+    if slot > now:
+        await asyncio.sleep(slot - now)
+
+
+def _retry_delay(attempt: int, response: httpx.Response | None) -> float:
+    """Exponential backoff, or the server's Retry-After (seconds) when it sends one."""
+    if response is not None:
+        try:
+            return min(float(response.headers["Retry-After"]), _RETRY_MAX_WAIT)
+        except (KeyError, ValueError):
+            pass
+    return min(_RETRY_MAX_WAIT, _RETRY_BASE * 2 ** attempt)
+
+
+async def close_http_client() -> None:
+    """Close the shared pool (called on app shutdown)."""
+    global _http_client, _ec2_sem, _test_run_sem
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+    _ec2_sem = _test_run_sem = None
+
+
+def _dumps(obj: object) -> str:
+    """Pretty-print a payload for the logs."""
+    return orjson.dumps(obj, default=str, option=orjson.OPT_INDENT_2).decode()
+
+
+def _truncate_for_log(body: dict, max_str: int = 4000) -> dict:
+    """Shallow copy of *body* with long string fields (test output etc.) replaced by ``<N chars>``."""
+    return {
+        k: f"<{len(v)} chars>" if isinstance(v, str) and len(v) > max_str else v
+        for k, v in body.items()
+    }
+
+
 def _log_request(method: str, url: str, payload: dict | None = None, params: dict | None = None) -> None:
     """Log outgoing EC2 agent request."""
-    logger.info("\n" + "="*60)
-    logger.info(f"[EC2-REQ] {method} {url}")
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    parts = ["\n" + "=" * 60, f"[EC2-REQ] {method} {url}"]
     if params:
-        logger.info(f"[EC2-REQ] PARAMS: {json.dumps(params, indent=2)}")
+        parts.append(f"[EC2-REQ] PARAMS: {_dumps(params)}")
     if payload:
-        logger.info(f"[EC2-REQ] BODY: {json.dumps(payload, indent=2, default=str)}")
-    logger.info("="*60)
+        parts.append(f"[EC2-REQ] BODY: {_dumps(payload)}")
+    parts.append("=" * 60)
+    logger.info("%s", "\n".join(parts))
 
 
 def _log_response(operation: str, status: int, body: dict | str, duration_ms: float) -> None:
     """Log incoming EC2 agent response."""
-    logger.info("\n" + "-"*60)
-    logger.info(f"[EC2-RES] {operation} → HTTP {status} ({duration_ms:.0f}ms)")
-    body_str = json.dumps(body, indent=2, default=str) if isinstance(body, dict) else str(body)[:2000]
-    logger.info(f"[EC2-RES] BODY:\n{body_str}")
-    logger.info("-"*60)
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    body_str = _dumps(_truncate_for_log(body)) if isinstance(body, dict) else str(body)[:2000]
+    logger.info(
+        "%s\n[EC2-RES] %s → HTTP %d (%.0fms)\n[EC2-RES] BODY:\n%s\n%s",
+        "\n" + "-" * 60, operation, status, duration_ms, body_str, "-" * 60,
+    )
+
+
+async def _iter_sse_data(response: httpx.Response) -> AsyncIterator[bytearray]:
+    """Yield the payload of each ``data:`` line of an SSE response.
+
+    Splits raw bytes on ``\\n`` with a single rolling buffer, so a line is only
+    materialised once its terminator has arrived.
+    """
+    # The agent doesn't compress its SSE, so read the wire bytes directly and skip
+    # httpx's per-chunk decoder. A proxy that adds Content-Encoding still gets
+    # decoded, and an already-buffered body can only be replayed by aiter_bytes.
+    if "content-encoding" in response.headers or response.is_stream_consumed:
+        chunks = response.aiter_bytes()
+    else:
+        chunks = response.aiter_raw()
+    buf = bytearray()
+    async for chunk in chunks:
+        buf += chunk
+        start = 0
+        while (nl := buf.find(b"\n", start)) != -1:
+            end = nl - 1 if nl > start and buf[nl - 1] == 0x0D else nl  # drop \r of \r\n
+            if buf.startswith(_SSE_PREFIX, start, end):
+                yield buf[start + _SSE_PREFIX_LEN:end]
+            start = nl + 1
+        if start:
+            del buf[:start]
+    if buf.startswith(_SSE_PREFIX):
+        yield buf[_SSE_PREFIX_LEN:].rstrip(b"\r")
+
+
+def _sse_event_type(data: bytearray) -> bytes | None:
+    """Read ``type`` straight from an event payload that starts with it, without decoding.
+
+    The agent always serialises ``type`` first; returns None for any other shape.
+    """
+    for prefix in _SSE_TYPE_PREFIXES:
+        if data.startswith(prefix):
+            end = data.find(b'"', len(prefix))
+            return bytes(data[len(prefix):end]) if end != -1 else None
+    return None
+
+
+async def _drain_lines(
+    queue: "asyncio.Queue[tuple[str, str]]",
+    on_line: Callable[[str, str], Awaitable[None]],
+) -> None:
+    """Consume (phase, line) pairs in batches so a slow callback doesn't stall the SSE read."""
+    while True:
+        batch = [await queue.get()]
+        while len(batch) < _LINE_BATCH and not queue.empty():
+            batch.append(queue.get_nowait())
+        try:
+            for phase, line in batch:
+                try:
+                    await on_line(phase, line)
+                except Exception as exc:
+                    logger.warning("[EC2] on_line callback failed: %s", exc)
+        finally:
+            for _ in batch:
+                queue.task_done()
 
 
 class EC2Client:
@@ -41,32 +216,24 @@ class EC2Client:
     or EC2AgentUnreachable if the agent cannot be reached.
     """
 
-    def __init__(self):
-        self.base_url = api_settings.ec2_agent_url.rstrip("/")
-        self.headers = {}
-        if api_settings.ec2_agent_api_key:
-            self.headers["X-API-Key"] = api_settings.ec2_agent_api_key
-
-    def _client(self) -> httpx.AsyncClient:
-        """Create an async HTTP client with shared config."""
-        return httpx.AsyncClient(
-            base_url=self.base_url,
-            headers=self.headers,
-            timeout=300.0,  # Long timeout — Docker test runs can take time
-        )
+    def __init__(self, http_client: httpx.AsyncClient | None = None):
+        self.base_url = _BASE_URL
+        self.headers = _HEADERS
+        self._http = http_client or get_http_client()
 
     async def ping(self) -> bool:
         """Check ec2-agent health. Raises EC2AgentUnreachable on failure."""
         url = f"{self.base_url}/api/v1/health"
         _log_request("GET", url)
-        t0 = time.monotonic()
+        clock = asyncio.get_running_loop().time
+        t0 = clock()
         try:
-            async with self._client() as client:
-                response = await client.get("/api/v1/health")
-                response.raise_for_status()
-                body = response.json()
-                _log_response("ping", response.status_code, body, (time.monotonic()-t0)*1000)
-                return True
+            # Health check: no retries, a down agent should be reported promptly
+            response = await self._http.get("/api/v1/health")
+            response.raise_for_status()
+            body = orjson.loads(response.content)
+            _log_response("ping", response.status_code, body, (clock() - t0) * 1000)
+            return True
         except httpx.ConnectError as e:
             raise EC2AgentUnreachable(
                 f"Cannot reach EC2 agent at {self.base_url}: {e}"
@@ -82,20 +249,7 @@ class EC2Client:
         params = {"repo_url": repo_url, "language": language}
         if user_id:
             params["user_id"] = user_id
-        url = f"{self.base_url}/api/v1/sessions"
-        _log_request("POST", url, params=params)
-        t0 = time.monotonic()
-        try:
-            async with self._client() as client:
-                response = await client.post("/api/v1/sessions", params=params)
-                self._raise_for_status(response, "create_session")
-                body = response.json()
-                _log_response("create_session", response.status_code, body, (time.monotonic()-t0)*1000)
-                return body
-        except (EC2AgentError, EC2AgentUnreachable):
-            raise
-        except httpx.ConnectError as e:
-            raise EC2AgentUnreachable(str(e))
+        return await self._request("POST", "/api/v1/sessions", "create_session", params=params)
 
     async def execute_tests(
         self,
@@ -111,20 +265,7 @@ class EC2Client:
         if test_command:
             payload["test_command"] = test_command
 
-        url = f"{self.base_url}/api/v1/execute"
-        _log_request("POST", url, payload=payload)
-        t0 = time.monotonic()
-        try:
-            async with self._client() as client:
-                response = await client.post("/api/v1/execute", json=payload)
-                self._raise_for_status(response, "execute_tests")
-                body = response.json()
-                _log_response("execute_tests", response.status_code, body, (time.monotonic()-t0)*1000)
-                return body
-        except (EC2AgentError, EC2AgentUnreachable):
-            raise
-        except httpx.ConnectError as e:
-            raise EC2AgentUnreachable(str(e))
+        return await self._request("POST", "/api/v1/execute", "execute_tests", json=payload, test_run=True)
 
     async def execute_tests_streaming(
         self,
@@ -152,38 +293,60 @@ class EC2Client:
         _log_request("POST", url, payload=payload)
 
         result: dict = {}
-
+        streamed = True
+
+        # Lines are handed to a background consumer so the read loop keeps pulling
+        # frames while on_line (usually a WebSocket send) is busy
+        lines: "asyncio.Queue[tuple[str, str]] | None" = None
+        consumer: asyncio.Task | None = None
+        if on_line is not None:
+            lines = asyncio.Queue(maxsize=_LINE_QUEUE_SIZE)
+            consumer = asyncio.create_task(_drain_lines(lines, on_line))
+
+        # Rate-limited but not counted against the test-run cap: the stream is held
+        # for the whole test run, and its fallback issues a capped request from inside it
+        await _pace()
         try:
-            async with httpx.AsyncClient(
-                base_url=self.base_url,
-                headers=self.headers,
-                timeout=300.0,
-            ) as client:
-                async with client.stream("POST", "/api/v1/execute/stream", json=payload) as response:
+            try:
+                async with self._http.stream("POST", "/api/v1/execute/stream", json=payload) as response:
                     if not response.is_success:
                         # Fall back to non-streaming
                         logger.warning(f"[EC2] Streaming endpoint returned {response.status_code}, falling back")
-                        return await self.execute_tests(session_id, install_command, test_command, branch)
-
-                    async for raw_line in response.aiter_lines():
-                        if not raw_line.startswith("data: "):
-                            continue
-                        try:
-                            event = json.loads(raw_line[6:])
-                        except json.JSONDecodeError:
-                            continue
-
-                        event_type = event.get("type")
-
-                        if event_type == "log" and on_line:
-                            await on_line(event.get("phase", ""), event.get("line", ""))
-                        elif event_type == "result":
-                            result = event.get("data", {})
-                        elif event_type == "done":
-                            break
-
-        except (httpx.ConnectError, httpx.StreamError) as e:
-            logger.warning(f"[EC2] Streaming failed ({e}), falling back to blocking execute")
+                        streamed = False
+                    else:
+                        async for data in _iter_sse_data(response):
+                            kind = _sse_event_type(data)
+                            if kind == b"done":
+                                break
+                            # Log frames dominate the stream — don't decode them if nobody listens
+                            if kind == b"log" and lines is None:
+                                continue
+                            try:
+                                event = orjson.loads(data)
+                            except orjson.JSONDecodeError:
+                                continue
+
+                            event_type = event.get("type")
+
+                            if event_type == "log" and lines is not None:
+                                await lines.put((event.get("phase", ""), event.get("line", "")))
+                            elif event_type == "result":
+                                result = event.get("data", {})
+                            elif event_type == "done":
+                                break
+
+            except (httpx.ConnectError, httpx.StreamError) as e:
+                logger.warning(f"[EC2] Streaming failed ({e}), falling back to blocking execute")
+                streamed = False
+
+            # Deliver every line already read before returning or falling back
+            if lines is not None:
+                await lines.join()
+        finally:
+            if consumer is not None:
+                consumer.cancel()
+
+        if not streamed:
             return await self.execute_tests(session_id, install_command, test_command, branch)
 
         if not result:
@@ -213,22 +376,29 @@ class EC2Client:
             payload["test_command"] = test_command
 
         # Log with truncated fix_content to keep logs readable
-        log_payload = dict(payload)
-        log_payload["fix_content"] = f"<{len(fix_content)} chars>"
-        url = f"{self.base_url}/api/v1/fix"
-        _log_request("POST", url, payload=log_payload)
-        t0 = time.monotonic()
-        try:
-            async with self._client() as client:
-                response = await client.post("/api/v1/fix", json=payload)
-                self._raise_for_status(response, "apply_fix")
-                body = response.json()
-                _log_response("apply_fix", response.status_code, body, (time.monotonic()-t0)*1000)
+        log_payload = {**payload, "fix_content": f"<{len(fix_content)} chars>"}
+
+        # Prefer the multipart endpoint: the file rides as raw bytes, not a JSON-escaped string
+        global _fix_upload_supported
+        if _fix_upload_supported is not False:
+            form = {k: v for k, v in payload.items() if k != "fix_content"}
+            body = await self._request(
+                "POST", "/api/v1/fix/upload", "apply_fix",
+                data=form,
+                files={"fix_content": (file_path.rsplit("/", 1)[-1], fix_content.encode("utf-8"))},
+                log_payload=log_payload,
+                allow_missing=True,
+                test_run=True,
+            )
+            if body is not None:
+                _fix_upload_supported = True
                 return body
-        except (EC2AgentError, EC2AgentUnreachable):
-            raise
-        except httpx.ConnectError as e:
-            raise EC2AgentUnreachable(str(e))
+            logger.warning("[EC2] fix/upload not available on agent, using JSON /fix")
+            _fix_upload_supported = False
+
+        return await self._request(
+            "POST", "/api/v1/fix", "apply_fix", json=payload, log_payload=log_payload, test_run=True,
+        )
 
     async def commit_fix(
         self,
@@ -247,78 +417,165 @@ class EC2Client:
         }
         if github_token:
             payload["github_token"] = github_token
-        url = f"{self.base_url}/api/v1/commit"
-        _log_request("POST", url, payload=payload)
-        t0 = time.monotonic()
-        try:
-            async with self._client() as client:
-                response = await client.post("/api/v1/commit", json=payload)
-                self._raise_for_status(response, "commit_fix")
-                body = response.json()
-                _log_response("commit_fix", response.status_code, body, (time.monotonic()-t0)*1000)
-                return body
-        except (EC2AgentError, EC2AgentUnreachable):
-            raise
-        except httpx.ConnectError as e:
-            raise EC2AgentUnreachable(str(e))
+        return await self._request("POST", "/api/v1/commit", "commit_fix", json=payload)
+
+    async def commit_fixes_batch(
+        self,
+        session_id: str,
+        fixes: list[tuple[str, str]],
+        branch_name: str = "fix/greenbranch",
+        github_token: str | None = None,
+    ) -> dict | None:
+        """POST /api/v1/commit/batch — one commit + push for many (file, message) pairs.
+
+        Returns None if the agent does not expose the batch endpoint (older agents),
+        so callers can fall back to per-file commit_fix.
+        """
+        payload: dict = {
+            "session_id": session_id,
+            "files": [{"file_path": f, "commit_message": m} for f, m in fixes],
+            "branch_name": branch_name,
+        }
+        if github_token:
+            payload["github_token"] = github_token
+        body = await self._request(
+            "POST", "/api/v1/commit/batch", "commit_fixes_batch", json=payload, allow_missing=True,
+        )
+        if body is None:
+            logger.warning("[EC2] commit/batch not available on agent, falling back to per-file commits")
+        return body
 
     async def delete_session(self, session_id: str) -> dict:
         """DELETE /api/v1/sessions/{session_id} — clean up session."""
-        url = f"{self.base_url}/api/v1/sessions/{session_id}"
-        _log_request("DELETE", url)
-        t0 = time.monotonic()
-        try:
-            async with self._client() as client:
-                response = await client.delete(f"/api/v1/sessions/{session_id}")
-                self._raise_for_status(response, "delete_session")
-                body = response.json()
-                _log_response("delete_session", response.status_code, body, (time.monotonic()-t0)*1000)
-                return body
-        except (EC2AgentError, EC2AgentUnreachable):
-            raise
-        except httpx.ConnectError as e:
-            raise EC2AgentUnreachable(str(e))
+        return await self._request("DELETE", f"/api/v1/sessions/{session_id}", "delete_session")
 
     async def get_session(self, session_id: str) -> dict:
         """GET /api/v1/sessions/{session_id}."""
-        url = f"{self.base_url}/api/v1/sessions/{session_id}"
-        _log_request("GET", url)
-        t0 = time.monotonic()
-        try:
-            async with self._client() as client:
-                response = await client.get(f"/api/v1/sessions/{session_id}")
-                self._raise_for_status(response, "get_session")
-                body = response.json()
-                _log_response("get_session", response.status_code, body, (time.monotonic()-t0)*1000)
-                return body
-        except (EC2AgentError, EC2AgentUnreachable):
-            raise
-        except httpx.ConnectError as e:
-            raise EC2AgentUnreachable(str(e))
+        return await self._request("GET", f"/api/v1/sessions/{session_id}", "get_session")
 
     async def read_file(self, session_id: str, file_path: str) -> str:
-        """GET /api/v1/files — read a file from the cloned session repo.
+        """GET /api/v1/files/raw — read a file from the cloned session repo.
 
+        The raw endpoint returns the file as the response body, so there is no
+        JSON to parse; falls back to GET /api/v1/files on older agents.
         Returns the file content as a string, or empty string on failure.
         """
-        url = f"{self.base_url}/api/v1/files"
+        global _raw_files_supported
         params = {"session_id": session_id, "file_path": file_path}
-        _log_request("GET", url, params=params)
-        t0 = time.monotonic()
-        try:
-            async with self._client() as client:
-                response = await client.get("/api/v1/files", params=params)
-                body = response.json()
-                _log_response("read_file", response.status_code, body, (time.monotonic()-t0)*1000)
-                if response.is_success:
-                    return body.get("content", "")
+        if _raw_files_supported is not False:
+            url = f"{self.base_url}/api/v1/files/raw"
+            _log_request("GET", url, params=params)
+            clock = asyncio.get_running_loop().time if logger.isEnabledFor(logging.INFO) else None
+            t0 = clock() if clock else 0.0
+            try:
+                response = await self._send("GET", "/api/v1/files/raw", params=params)
+            except Exception as exc:
+                logger.warning(f"[EC2-RES] read_file failed (non-fatal): {exc}")
                 return ""
+            if not self._route_missing(response):
+                _raw_files_supported = True
+                if not response.is_success:
+                    return ""  # missing file — expected while probing candidate paths
+                content = response.text
+                if clock:
+                    _log_response("read_file", response.status_code, f"<{len(content)} chars>", (clock() - t0) * 1000)
+                return content
+            logger.warning("[EC2] files/raw not available on agent, using JSON /files")
+            _raw_files_supported = False
+
+        try:
+            body = await self._request("GET", "/api/v1/files", "read_file", params=params)
+        except EC2AgentError:
+            return ""  # missing file — expected while probing candidate paths
         except Exception as exc:
             logger.warning(f"[EC2-RES] read_file failed (non-fatal): {exc}")
             return ""
+        return body.get("content", "")
 
     # ── Internal ──────────────────────────────────────────
 
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        operation: str,
+        *,
+        json: dict | None = None,
+        params: dict | None = None,
+        data: dict | None = None,
+        files: dict | None = None,
+        log_payload: dict | None = None,
+        allow_missing: bool = False,
+        test_run: bool = False,
+    ) -> dict | None:
+        """Send one request and return the decoded JSON body.
+
+        Logs request/response, raises EC2AgentError on non-2xx and
+        EC2AgentUnreachable on connection failure.  With ``allow_missing``,
+        returns None when the agent doesn't have the route (older agents).
+        ``test_run`` marks a request that runs the test suite on the agent.
+        """
+        if log_payload is None:
+            log_payload = json or data
+        _log_request(method, f"{self.base_url}{path}", payload=log_payload, params=params)
+        # Timing only feeds the INFO response log — skip the clock reads when it's off
+        clock = asyncio.get_running_loop().time if logger.isEnabledFor(logging.INFO) else None
+        t0 = clock() if clock else 0.0
+        try:
+            response = await self._send(
+                method, path, test_run=test_run, json=json, params=params, data=data, files=files,
+            )
+        except httpx.ConnectError as e:
+            raise EC2AgentUnreachable(str(e))
+        if allow_missing and self._route_missing(response):
+            return None
+        self._raise_for_status(response, operation)
+        body = orjson.loads(response.content)
+        if clock:
+            _log_response(operation, response.status_code, body, (clock() - t0) * 1000)
+        return body
+
+    async def _send(self, method: str, path: str, *, test_run: bool = False, **kwargs) -> httpx.Response:
+        """Issue one request under the shared concurrency cap and rate limit.
+
+        Test runs are capped by ``ec2_max_test_runs`` instead of
+        ``ec2_max_concurrency``, so minutes-long runs never hold the slots the
+        short calls need. Retries ``ec2_max_retries`` times on HTTP 429 and on
+        connection errors (the request never reached the agent, so a retry is safe).
+        """
+        _init_limits()
+        sem = _test_run_sem if test_run else _ec2_sem
+        retries = get_settings().ec2_max_retries
+        attempt = 0
+        while True:
+            async with sem:
+                await _pace()
+                try:
+                    response = await self._http.request(method, path, **kwargs)
+                except httpx.ConnectError:
+                    if attempt >= retries:
+                        raise
+                    response = None
+            if response is not None and (response.status_code != 429 or attempt >= retries):
+                return response
+            delay = _retry_delay(attempt, response)
+            logger.warning(
+                "[EC2] %s %s %s, retrying in %.1fs (%d/%d)",
+                method, path, "rate limited" if response is not None else "unreachable",
+                delay, attempt + 1, retries,
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _route_missing(self, response: httpx.Response) -> bool:
+        """True if the agent answered 404 for an unknown route (i.e. an older agent)."""
+        if response.status_code != 404:
+            return False
+        try:
+            return orjson.loads(response.content).get("detail") == "Not Found"
+        except (orjson.JSONDecodeError, AttributeError):
+            return False
+
     def _raise_for_status(self, response: httpx.Response, operation: str) -> None:
         """Raise EC2AgentError for non-2xx responses with context."""
         if response.is_success:
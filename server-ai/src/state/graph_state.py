@@ -29,8 +29,8 @@ class GraphState(TypedDict):
     max_iterations: int
 
     # ── Tracking (for dashboard) ──
-    fixes_applied: list[dict[str, Any]]      # FixApplied dicts
-    ci_timeline: list[dict[str, Any]]        # CITimelineEntry dicts
+    fixes_applied: list[dict[str, Any] | None]  # FixApplied dicts, one preallocated slot per iteration
+    ci_timeline: list[dict[str, Any] | None]    # CITimelineEntry dicts, one preallocated slot per iteration
     total_failures_detected: int             # Total unique failures found
     fixed_files: list[str]
     commit_hash: str | None
@@ -1,7 +1,9 @@
 from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
 
 from src.app.handlers import handle_endpoint
-from src.models import ExecuteTestsRequest
+from src.models import ExecuteTestsRequest, ExecuteTestsResponse
+from src.services.session_locks import session_lock
 from src.services.test_runner import TestRunner
 from src.services.session_store import session_store
 
@@ -23,16 +25,22 @@ async def execute_tests(request: ExecuteTestsRequest):
     language = session["language"]
     branch = request.branch or "main"  # Use provided branch or default
 
-    # Run tests via TestRunner
+    # Run tests via TestRunner — clone/install/test block for minutes, so keep
+    # them off the event loop or every other request waits behind this one
     test_runner = TestRunner()
-    result = test_runner.run_tests(
-        repo_url=repo_url,
-        session_id=request.session_id,
-        language=language,
-        branch=branch,
-        install_command=request.install_command,
-        test_command=request.test_command,
-    )
+
+    def run() -> ExecuteTestsResponse:
+        with session_lock(request.session_id):
+            return test_runner.run_tests(
+                repo_url=repo_url,
+                session_id=request.session_id,
+                language=language,
+                branch=branch,
+                install_command=request.install_command,
+                test_command=request.test_command,
+            )
+
+    result = await run_in_threadpool(run)
 
     # Update session status based on result
     new_status = "completed" if result.status == "success" else "failed"
@@ -1,8 +1,10 @@
 """Files endpoint — read file contents from a cloned session repo."""
 
 import os
+import stat
+from functools import lru_cache
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
 
 from src.app.handlers import handle_endpoint
 from src.services.git_service import GitService
@@ -11,35 +13,74 @@ from src.services.session_store import session_store
 router = APIRouter(tags=["Files"])
 
 
-@router.get("/files")
-@handle_endpoint
-async def read_file(
-    session_id: str = Query(..., description="The session ID"),
-    file_path: str = Query(..., description="Relative path of the file within the repo"),
-):
-    """Read the current contents of a file in a cloned session repo."""
+@lru_cache(maxsize=128)
+def _session_root(repo_path: str) -> str:
+    """Normalised repo directory with a trailing separator (reused across reads)."""
+    return os.path.normpath(repo_path) + os.sep
+
+
+def _read_session_bytes(session_id: str, file_path: str) -> bytes:
+    """Read a file from a session repo as raw bytes (404/400 via HTTPException)."""
     # Validate session
     session_store.get(session_id)  # raises SessionNotFoundError if missing
 
     git_service = GitService()
     repo_path = git_service.get_repo_path(session_id)
 
-    abs_path = os.path.join(repo_path, file_path)
-    abs_path = os.path.normpath(abs_path)
+    root = _session_root(repo_path)
+    abs_path = os.path.normpath(root + file_path)
 
-    # Security: ensure the resolved path is still inside the repo
-    if not abs_path.startswith(os.path.normpath(repo_path)):
+    # Security: ensure the resolved path is still inside the repo (the trailing
+    # separator keeps a sibling like /repos/<id>-other from passing the check)
+    if not abs_path.startswith(root):
         raise HTTPException(status_code=400, detail="Invalid file path — path traversal not allowed")
 
-    if not os.path.isfile(abs_path):
+    # One open + fstat (instead of isfile + open), then a raw read — skips the text-mode io layer
+    try:
+        fd = os.open(abs_path, os.O_RDONLY)
+    except OSError:
         raise HTTPException(status_code=404, detail=f"File not found in session: {file_path}")
+    try:
+        st = os.fstat(fd)
+        if not stat.S_ISREG(st.st_mode):
+            raise HTTPException(status_code=404, detail=f"File not found in session: {file_path}")
+        chunks = []
+        while chunk := os.read(fd, max(st.st_size, 65536)):
+            chunks.append(chunk)
+    finally:
+        os.close(fd)
+    return b"".join(chunks)
 
-    with open(abs_path, "r", encoding="utf-8", errors="replace") as f:
-        content = f.read()
 
+def _normalise_newlines(data: bytes) -> bytes:
+    """Same newline normalisation text-mode open() applied."""
+    if b"\r" in data:
+        data = data.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    return data
+
+
+@router.get("/files")
+@handle_endpoint
+async def read_file(
+    session_id: str = Query(..., description="The session ID"),
+    file_path: str = Query(..., description="Relative path of the file within the repo"),
+):
+    """Read the current contents of a file in a cloned session repo."""
+    data = _read_session_bytes(session_id, file_path)
     return {
         "session_id": session_id,
         "file_path": file_path,
-        "content": content,
-        "size_bytes": len(content.encode("utf-8")),
+        "content": _normalise_newlines(data).decode("utf-8", errors="replace"),
+        "size_bytes": len(data),
     }
+
+
+@router.get("/files/raw")
+@handle_endpoint
+async def read_file_raw(
+    session_id: str = Query(..., description="The session ID"),
+    file_path: str = Query(..., description="Relative path of the file within the repo"),
+):
+    """Same as /files, but the body is the file itself (``text/plain``) — no JSON wrapper."""
+    data = _normalise_newlines(_read_session_bytes(session_id, file_path))
+    return Response(content=data, media_type="text/plain; charset=utf-8")
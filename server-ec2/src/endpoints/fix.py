@@ -1,8 +1,10 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, File, Form, UploadFile
+from fastapi.concurrency import run_in_threadpool
 
 from src.app.handlers import handle_endpoint
-from src.models import ApplyFixRequest, CommitFixRequest
+from src.models import ApplyFixRequest, CommitBatchRequest, CommitFixRequest
 from src.services.git_service import GitService
+from src.services.session_locks import session_lock
 from src.services.session_store import session_store
 from src.services.test_runner import TestRunner
 
@@ -13,28 +15,66 @@ router = APIRouter(tags=["Fix"])
 @handle_endpoint
 async def apply_fix(request: ApplyFixRequest):
     """Apply AI-generated fix locally and run tests (no git operations)."""
+    return await run_in_threadpool(
+        _apply_and_test,
+        request.session_id,
+        request.file_path,
+        request.fix_content,
+        request.install_command,
+        request.test_command,
+    )
+
+
+@router.post("/fix/upload")
+@handle_endpoint
+async def apply_fix_upload(
+    session_id: str = Form(..., description="Session identifier"),
+    file_path: str = Form(..., description="Relative path of file to fix"),
+    fix_content: UploadFile = File(..., description="New content for the file (UTF-8)"),
+    install_command: str | None = Form(default=None, description="Optional custom install command"),
+    test_command: str | None = Form(default=None, description="Optional custom test command"),
+):
+    """Same as /fix, but the new file content arrives as a multipart file part.
+
+    The bytes are written to disk as-is — no JSON string escaping on the way
+    in and no decode/re-encode before the write.
+    """
+    content = await fix_content.read()
+    return await run_in_threadpool(_apply_and_test, session_id, file_path, content, install_command, test_command)
+
+
+def _apply_and_test(
+    session_id: str,
+    file_path: str,
+    fix_content: str | bytes,
+    install_command: str | None,
+    test_command: str | None,
+) -> dict:
+    """Write the fix and run the test suite — blocking, called via run_in_threadpool."""
     # Validate session exists (raises SessionNotFoundError if missing)
-    session = session_store.get(request.session_id)
+    session = session_store.get(session_id)
 
     git_service = GitService()
 
-    # 1. Write the fixed file to disk
-    git_service.write_file(request.session_id, request.file_path, request.fix_content)
-
-    # 2. Run tests with the fix applied
-    test_runner = TestRunner()
-    result = test_runner.run_tests(
-        repo_url=session["repo_url"],
-        session_id=request.session_id,
-        language=session["language"],
-        branch=session.get("branch", "main"),  # Use session branch, not a hardcoded value
-        install_command=request.install_command,
-        test_command=request.test_command,
-    )
-
-    # Update session status in Redis
-    new_status = "fix_verified" if result.status == "success" else "fix_failed"
-    session_store.update(request.session_id, {"status": new_status})
+    # One write-and-test at a time per session, so runs don't see each other's files
+    with session_lock(session_id):
+        # 1. Write the fixed file to disk
+        git_service.write_file(session_id, file_path, fix_content)
+
+        # 2. Run tests with the fix applied
+        test_runner = TestRunner()
+        result = test_runner.run_tests(
+            repo_url=session["repo_url"],
+            session_id=session_id,
+            language=session["language"],
+            branch=session.get("branch", "main"),  # Use session branch, not a hardcoded value
+            install_command=install_command,
+            test_command=test_command,
+        )
+
+        # Update session status in Redis
+        new_status = "fix_verified" if result.status == "success" else "fix_failed"
+        session_store.update(session_id, {"status": new_status})
 
     return {
         "success": result.status == "success",
@@ -48,29 +88,87 @@ async def apply_fix(request: ApplyFixRequest):
 @handle_endpoint
 async def commit_fix(request: CommitFixRequest):
     """Create branch, commit changes, and push to GitHub."""
+    return await run_in_threadpool(_commit_one, request)
+
+
+def _commit_one(request: CommitFixRequest) -> dict:
+    """Branch, commit and push one file — blocking, called via run_in_threadpool."""
     # Validate session exists (raises SessionNotFoundError if missing)
-    session = session_store.get(request.session_id)
+    session_store.get(request.session_id)
 
     git_service = GitService()
 
-    # 1. Create/checkout the fix branch
-    git_service.create_branch(request.session_id, request.branch_name)
+    with session_lock(request.session_id):
+        # 1. Create/checkout the fix branch
+        git_service.create_branch(request.session_id, request.branch_name)
 
-    # 2. Commit and push (file should already be written by /fix)
-    commit_hash = git_service.commit_and_push(
-        session_id=request.session_id,
-        file_path=request.file_path,
-        commit_message=request.commit_message,
-        branch_name=request.branch_name,
-        github_token=request.github_token,
-    )
+        # 2. Commit and push (file should already be written by /fix)
+        commit_hash = git_service.commit_and_push(
+            session_id=request.session_id,
+            file_path=request.file_path,
+            commit_message=request.commit_message,
+            branch_name=request.branch_name,
+            github_token=request.github_token,
+        )
 
-    # Update session status in Redis
-    session_store.update(request.session_id, {"status": "committed"})
+        # Update session status in Redis
+        session_store.update(request.session_id, {"status": "committed"})
 
     return {
         "success": True,
         "commit_hash": commit_hash,
         "branch_name": request.branch_name,
         "message": f"Changes committed and pushed to {request.branch_name}",
-    }
\ No newline at end of file
+    }
+
+
+@router.post("/commit/batch")
+@handle_endpoint
+async def commit_fixes_batch(request: CommitBatchRequest):
+    """Commit several fixed files in ONE commit and push once.
+
+    Replaces N round-trips to /commit (each with its own add/commit/push)
+    with a single git add + commit + push.
+    """
+    return await run_in_threadpool(_commit_batch, request)
+
+
+def _commit_batch(request: CommitBatchRequest) -> dict:
+    """Branch, commit and push — blocking, called via run_in_threadpool."""
+    # Validate session exists (raises SessionNotFoundError if missing)
+    session_store.get(request.session_id)
+
+    git_service = GitService()
+
+    # The subject summarises, the body lists each fix
+    file_paths = list(dict.fromkeys(f.file_path for f in request.files))
+    if len(request.files) == 1:
+        commit_message = request.files[0].commit_message
+    else:
+        body = "\n".join(f"- {f.commit_message}" for f in request.files)
+        commit_message = f"[AI-AGENT] Fix {len(file_paths)} file(s)\n\n{body}"
+
+    with session_lock(request.session_id):
+        # 1. Create/checkout the fix branch
+        git_service.create_branch(request.session_id, request.branch_name)
+
+        # 2. One commit for all files, one push
+        commit_hash = git_service.commit_files_and_push(
+            session_id=request.session_id,
+            file_paths=file_paths,
+            commit_message=commit_message,
+            branch_name=request.branch_name,
+            github_token=request.github_token,
+        )
+
+        # Update session status in Redis
+        session_store.update(request.session_id, {"status": "committed"})
+
+    return {
+        "success": True,
+        "commit_hash": commit_hash,
+        "branch_name": request.branch_name,
+        "total_commits": 1,
+        "files_committed": file_paths,
+        "message": f"{len(file_paths)} file(s) committed and pushed to {request.branch_name}",
+    }
@@ -13,6 +13,7 @@ from src.app.handlers import handle_endpoint
 from src.models import ExecuteTestsRequest
 from src.services.docker_service import DockerService
 from src.services.git_service import GitService
+from src.services.session_locks import session_lock
 from src.services.session_store import session_store
 from src.utils.parsers import parse_test_output
 
@@ -176,14 +177,16 @@ async def execute_tests_streaming(request: ExecuteTestsRequest):
     branch = request.branch or "main"
 
     def generate():
-        yield from _stream_execution(
-            session=session,
-            session_id=request.session_id,
-            language=language,
-            branch=branch,
-            install_command=request.install_command,
-            test_command=request.test_command,
-        )
+        # Held for the whole stream: Starlette drives this generator in the threadpool
+        with session_lock(request.session_id):
+            yield from _stream_execution(
+                session=session,
+                session_id=request.session_id,
+                language=language,
+                branch=branch,
+                install_command=request.install_command,
+                test_command=request.test_command,
+            )
 
     return StreamingResponse(
         generate(),
@@ -1,7 +1,15 @@
 """Pydantic models for EC2 Agent API."""
 
 from src.models.execution import ExecuteTestsRequest, ExecuteTestsResponse, TestError
-from src.models.fix import ApplyFixRequest, ApplyFixResponse, CommitFixRequest, CommitFixResponse
+from src.models.fix import (
+    ApplyFixRequest,
+    ApplyFixResponse,
+    CommitFixRequest,
+    CommitFixResponse,
+    CommitBatchFile,
+    CommitBatchRequest,
+    CommitBatchResponse,
+)
 from src.models.session import SessionResponse
 
 __all__ = [
@@ -12,5 +20,8 @@ __all__ = [
     "ApplyFixResponse",
     "CommitFixRequest",
     "CommitFixResponse",
+    "CommitBatchFile",
+    "CommitBatchRequest",
+    "CommitBatchResponse",
     "SessionResponse",
 ]
\ No newline at end of file
@@ -49,4 +49,36 @@ class CommitFixResponse(BaseModel):
     success: bool = Field(..., description="Whether commit+push succeeded")
     commit_hash: str | None = Field(default=None, description="Git commit hash")
     branch_name: str = Field(..., description="Branch name")
-    message: str = Field(default="", description="Status message")
\ No newline at end of file
+    message: str = Field(default="", description="Status message")
+
+
+class CommitBatchFile(BaseModel):
+    """One file in a batched commit."""
+
+    file_path: str = Field(..., description="Relative path of file to commit")
+    commit_message: str = Field(..., description="Commit message for this file's fix")
+
+
+class CommitBatchRequest(BaseModel):
+    """Request body for POST /commit/batch — one commit + push for many files."""
+
+    session_id: str = Field(..., description="Session identifier")
+    files: list[CommitBatchFile] = Field(..., min_length=1, description="Files to stage and commit")
+    branch_name: str = Field(
+        default="fix/greenbranch",
+        description="Branch name (default: fix/greenbranch)"
+    )
+    github_token: str | None = Field(
+        default=None, description="GitHub OAuth token for authenticated push"
+    )
+
+
+class CommitBatchResponse(BaseModel):
+    """Response body from POST /commit/batch."""
+
+    success: bool = Field(..., description="Whether commit+push succeeded")
+    commit_hash: str | None = Field(default=None, description="Git commit hash")
+    branch_name: str = Field(..., description="Branch name")
+    total_commits: int = Field(default=0, description="Number of commits created")
+    files_committed: list[str] = Field(default_factory=list, description="Files included in the commit")
+    message: str = Field(default="", description="Status message")
@@ -120,17 +120,37 @@ class GitService:
     ) -> str:
         """Stage a file, commit, and push to remote.
 
+        Returns the commit hash.
+        """
+        return self.commit_files_and_push(
+            session_id=session_id,
+            file_paths=[file_path],
+            commit_message=commit_message,
+            branch_name=branch_name,
+            github_token=github_token,
+        )
+
+    def commit_files_and_push(
+        self,
+        session_id: str,
+        file_paths: list[str],
+        commit_message: str,
+        branch_name: str,
+        github_token: str | None = None,
+    ) -> str:
+        """Stage several files, create ONE commit, and push once.
+
         Returns the commit hash.
         """
         repo_path = self.get_repo_path(session_id)
         repo = self._get_repo(repo_path)
 
-        # Stage the file
-        repo.index.add([file_path])
+        # Stage the files
+        repo.index.add(file_paths)
 
         # Commit
         commit = repo.index.commit(commit_message)
-        logger.info(f"Committed: {commit.hexsha[:8]} — {commit_message}")
+        logger.info(f"Committed: {commit.hexsha[:8]} — {commit_message.splitlines()[0]} ({len(file_paths)} file(s))")
 
         # Set authenticated remote URL if token is provided
         origin = repo.remote("origin")
@@ -153,8 +173,8 @@ class GitService:
 
         return commit.hexsha
 
-    def write_file(self, session_id: str, file_path: str, content: str) -> str:
-        """Write content to a file in the cloned repo.
+    def write_file(self, session_id: str, file_path: str, content: str | bytes) -> str:
+        """Write content (text, or already UTF-8 encoded bytes) to a file in the cloned repo.
 
         Returns the absolute path of the written file.
         """
@@ -164,8 +184,13 @@ class GitService:
         # Ensure parent directory exists
         os.makedirs(os.path.dirname(abs_path), exist_ok=True)
 
-        with open(abs_path, "w") as f:
-            f.write(content)
+        data = memoryview(content if isinstance(content, bytes) else content.encode("utf-8"))
+        fd = os.open(abs_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            while data:
+                data = data[os.write(fd, data):]
+        finally:
+            os.close(fd)
 
         logger.info(f"Wrote fix to {file_path}")
         return abs_path
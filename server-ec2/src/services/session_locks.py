@@ -0,0 +1,22 @@
+"""Per-session locks — one operation at a time in a session's working tree."""
+
+import threading
+import weakref
+
+_locks: "weakref.WeakValueDictionary[str, threading.Lock]" = weakref.WeakValueDictionary()
+_guard = threading.Lock()
+
+
+def session_lock(session_id: str) -> threading.Lock:
+    """Return the lock guarding a session's repo checkout.
+
+    Endpoints run their blocking git/Docker work in the threadpool, so two
+    requests for the same session could otherwise write files, run tests or
+    commit in one tree at the same time. Locks are process-local (one uvicorn
+    worker by default) and dropped once no request holds them.
+    """
+    with _guard:
+        lock = _locks.get(session_id)
+        if lock is None:
+            lock = _locks[session_id] = threading.Lock()
+        return lock